@@ -0,0 +1,205 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Sequence, Tuple
+
+from settings import Config
+
+
+class Ticket:
+    """One /chat request waiting for (or holding) a worker slot"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self._granted = threading.Event()
+
+    @property
+    def wait_ms(self) -> float:
+        end = self.admitted_at if self.admitted_at is not None else time.monotonic()
+        return (end - self.enqueued_at) * 1000
+
+
+class AdmissionController:
+    """
+    Bounded worker slots with a bounded, per-session fair queue in front of them
+    Sessions waiting for a slot are served round-robin, so one user sending many requests only
+    delays their own. Requests are shed when the queue is full, when the expected wait already
+    exceeds the limit, or when they have waited that long without being admitted.
+    """
+
+    def __init__(self, max_workers: int = Config.ADMISSION_MAX_WORKERS,
+                 max_queue: int = Config.ADMISSION_MAX_QUEUE,
+                 max_per_session: int = Config.ADMISSION_MAX_PER_SESSION,
+                 max_queued_per_session: int = Config.ADMISSION_MAX_QUEUED_PER_SESSION,
+                 max_queue_wait: float = Config.ADMISSION_MAX_QUEUE_WAIT_SECONDS):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self.max_queued_per_session = max_queued_per_session
+        self.max_queue_wait = max_queue_wait
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._in_flight_by_session: Dict[str, int] = {}
+        # session -> its waiting tickets (FIFO); the OrderedDict order is the round-robin order
+        self._waiting: "OrderedDict[str, Deque[Ticket]]" = OrderedDict()
+        self._queue_depth = 0
+        self._service_ewma: Optional[float] = None
+        self._recent_waits: Deque[float] = deque(maxlen=1000)
+        self.counters = {'admitted': 0, 'completed': 0, 'shed_queue_full': 0,
+                         'shed_session_busy': 0, 'shed_expected_wait': 0, 'shed_queue_timeout': 0}
+
+    def acquire(self, session_id: str) -> Tuple[Optional[Ticket], Optional[str]]:
+        """
+        Wait for a worker slot
+        Returns: (ticket, None) once admitted, or (None, reason) if the request was shed
+        """
+        ticket = Ticket(session_id)
+        with self._lock:
+            if self._queue_depth == 0 and self._can_run(session_id):
+                self._admit(ticket)
+                return ticket, None
+            reason = self._reject_reason(session_id)
+            if reason:
+                self.counters[f'shed_{reason}'] += 1
+                return None, reason
+            self._waiting.setdefault(session_id, deque()).append(ticket)
+            self._queue_depth += 1
+            # Slots may be free while everyone queued is at their per-session limit
+            self._dispatch()
+        if ticket._granted.wait(self.max_queue_wait):
+            return ticket, None
+        with self._lock:
+            # Granted between the timeout and taking the lock: keep the slot
+            if ticket.admitted_at is not None:
+                return ticket, None
+            queue = self._waiting.get(session_id)
+            if queue and ticket in queue:
+                queue.remove(ticket)
+                self._queue_depth -= 1
+                if not queue:
+                    del self._waiting[session_id]
+            self.counters['shed_queue_timeout'] += 1
+        return None, 'queue_timeout'
+
+    def release(self, ticket: Ticket):
+        service_s = time.monotonic() - ticket.admitted_at
+        with self._lock:
+            self._in_flight -= 1
+            remaining = self._in_flight_by_session.get(ticket.session_id, 1) - 1
+            if remaining:
+                self._in_flight_by_session[ticket.session_id] = remaining
+            else:
+                self._in_flight_by_session.pop(ticket.session_id, None)
+            alpha = Config.ROUTER_EWMA_ALPHA
+            self._service_ewma = service_s if self._service_ewma is None else (
+                alpha * service_s + (1 - alpha) * self._service_ewma)
+            self.counters['completed'] += 1
+            self._dispatch()
+
+    def _can_run(self, session_id: str) -> bool:
+        return (self._in_flight < self.max_workers
+                and self._in_flight_by_session.get(session_id, 0) < self.max_per_session)
+
+    def _reject_reason(self, session_id: str) -> Optional[str]:
+        if self._queue_depth >= self.max_queue:
+            return 'queue_full'
+        if len(self._waiting.get(session_id, ())) >= self.max_queued_per_session:
+            return 'session_busy'
+        if self._service_ewma is not None:
+            # Fail fast rather than make the client wait for a slot it won't get in time
+            expected_wait = (self._queue_depth + 1) * self._service_ewma / self.max_workers
+            if expected_wait > self.max_queue_wait:
+                return 'expected_wait'
+        return None
+
+    def _admit(self, ticket: Ticket):
+        ticket.admitted_at = time.monotonic()
+        self._in_flight += 1
+        self._in_flight_by_session[ticket.session_id] = self._in_flight_by_session.get(ticket.session_id, 0) + 1
+        self._recent_waits.append(ticket.wait_ms)
+        self.counters['admitted'] += 1
+        ticket._granted.set()
+
+    def _dispatch(self):
+        """Hand free slots to waiting sessions in round-robin order"""
+        while self._in_flight < self.max_workers and self._waiting:
+            for session_id in list(self._waiting):
+                if self._can_run(session_id):
+                    queue = self._waiting.pop(session_id)
+                    ticket = queue.popleft()
+                    self._queue_depth -= 1
+                    if queue:
+                        # Back of the line for this session's next request
+                        self._waiting[session_id] = queue
+                    self._admit(ticket)
+                    break
+            else:
+                # Every waiting session is at its in-flight limit
+                return
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait before retrying"""
+        service = self._service_ewma or 1.0
+        return max(1, int(round((self._queue_depth + 1) * service / self.max_workers)))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            return {
+                'in_flight': self._in_flight,
+                'max_workers': self.max_workers,
+                'queue_depth': self._queue_depth,
+                'max_queue': self.max_queue,
+                'waiting_sessions': len(self._waiting),
+                'avg_wait_ms': round(sum(waits) / len(waits), 1) if waits else 0.0,
+                'p95_wait_ms': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+                'avg_service_ms': round(self._service_ewma * 1000, 1) if self._service_ewma else None,
+                **self.counters,
+            }
+
+
+class AnswerCache:
+    """
+    Small LRU of recent answers, served to shed requests
+    Keyed by the normalized question plus the conversation history it was answered with, so a
+    follow-up like "what about him?" is only served to a session whose recent turns match.
+    """
+
+    def __init__(self, max_items: int = Config.ANSWER_CACHE_SIZE, ttl: float = Config.ANSWER_CACHE_TTL_SECONDS):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(message: str, history: Sequence[Dict[str, Any]] = ()) -> str:
+        key = " ".join(message.lower().split())
+        if history:
+            turns = json.dumps([[turn.get('message'), turn.get('response')] for turn in history], ensure_ascii=False)
+            key += "\n" + hashlib.sha1(turns.encode('utf-8')).hexdigest()
+        return key
+
+    def get(self, message: str, history: Sequence[Dict[str, Any]] = ()) -> Optional[Dict[str, Any]]:
+        key = self._key(message, history)
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if time.time() - stored_at > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return result
+
+    def put(self, message: str, result: Dict[str, Any], history: Sequence[Dict[str, Any]] = ()):
+        key = self._key(message, history)
+        with self._lock:
+            self._items[key] = (time.time(), result)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
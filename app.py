@@ -1,31 +1,122 @@
-from flask import Flask, request, jsonify, send_from_directory, render_template_string
-import uuid
+from flask import Flask, Response, request, jsonify, make_response, abort, send_file
+import asyncio
+import contextlib
+import json
 import os
+import threading
+import time
+from datetime import datetime
 from politics_bot import PoliticsChatbotAgentic
-import json
+from session_store import SessionStore
+from admission import AdmissionController, AnswerCache
+from request_profiler import RequestProfiler
+from static_assets import AssetCache, TemplateCache, available_encodings, choose_encoding, compress
+from settings import Config
 
-app = Flask(__name__)
+# Static files go through send_static below, not Flask's built-in handler
+app = Flask(__name__, static_folder=None)
+# Cheap to construct: the LLM and API clients are only built on first use
 chatbot = PoliticsChatbotAgentic()
 
 SESSIONS_FILE = 'sessions.json'
 
-def load_sessions():
-    if os.path.exists(SESSIONS_FILE):
-        with open(SESSIONS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+# Loaded from disk on first access, not at import
+# SESSIONS_FILE is the old single-file store, imported into Config.SESSION_DIR on first run
+sessions = SessionStore(Config.SESSION_DIR, Config.SESSION_STATS_FILE, legacy_path=SESSIONS_FILE)
+
+admission = AdmissionController()
+answer_cache = AnswerCache()
+profiler = RequestProfiler()
+
+assets = AssetCache('static')
+index_page = TemplateCache(app.jinja_env, 'templates/index.html', assets)
+
+# One event loop for the whole process, on its own thread. The LLM and HTTP clients keep connection
+# pools that belong to the loop that opened them, so every request's coroutines run on this loop
+# rather than on a fresh asyncio.run() loop each.
+event_loop = asyncio.new_event_loop()
+threading.Thread(target=event_loop.run_forever, name='event-loop', daemon=True).start()
+
+def run_async(coro, timeout=Config.REQUEST_TIMEOUT_SECONDS):
+    """Run a coroutine on the shared event loop and wait up to `timeout` for its result from this (request) thread"""
+    future = asyncio.run_coroutine_threadsafe(coro, event_loop)
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        # Nobody is waiting for it any more: cancel it rather than leave it running on the loop
+        future.cancel()
+        raise
 
-def save_sessions():
-    with open(SESSIONS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(sessions, f, ensure_ascii=False, indent=2)
+def timed_out_result():
+    return {
+        "response": "I apologize, but your request took too long to answer. Please try again.",
+        "error": True,
+        "timestamp": datetime.now().isoformat()
+    }
 
-sessions = load_sessions()
+if Config.BACKGROUND_WARM_UP:
+    # Pay for the heavy imports off the request path once the worker is already serving; the LLM
+    # clients are built on the shared loop, where the router caches the ones requests will use
+    asyncio.run_coroutine_threadsafe(chatbot.warm_up(), event_loop)
+
+if Config.FEED_POLLING_ENABLED:
+    # Started by the app rather than by DataAggregator, so the batch runner and tests don't poll
+    from feed_ingest import start_feed_polling
+    start_feed_polling()
+
+def cached_json(etag, build):
+    """Answer 304 if the client already holds `etag`, else jsonify build() tagged with it"""
+    if request.if_none_match.contains_weak(etag):
+        resp = make_response('', 304)
+    else:
+        resp = make_response(jsonify(build()))
+    resp.set_etag(etag, weak=True)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+def send_cached(body, cache_control):
+    """Serve an in-memory body in the best encoding the client accepts, or 304 if unchanged"""
+    encoding = choose_encoding(request.accept_encodings, body.variants)
+    # Each encoding is a different byte sequence, so it gets its own strong ETag
+    etag = f"{body.digest}-{encoding}" if encoding else body.digest
+    if request.if_none_match.contains(etag):
+        resp = make_response('', 304)
+    else:
+        resp = make_response(body.variants[encoding] if encoding else body.data)
+        resp.headers['Content-Type'] = body.mimetype
+        if encoding:
+            resp.headers['Content-Encoding'] = encoding
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = cache_control
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+@app.after_request
+def compress_json(resp):
+    """Compress JSON bodies (chat answers, histories) for clients that accept it"""
+    if (resp.mimetype != 'application/json' or resp.status_code != 200
+            or resp.direct_passthrough or 'Content-Encoding' in resp.headers):
+        return resp
+    data = resp.get_data()
+    if len(data) < Config.COMPRESS_MIN_BYTES:
+        return resp
+    encoding = choose_encoding(request.accept_encodings, available_encodings())
+    if encoding is None:
+        return resp
+    resp.set_data(compress(data, encoding, Config.DYNAMIC_COMPRESSION_LEVELS[encoding]))
+    resp.headers['Content-Encoding'] = encoding
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+def page_limit():
+    limit = request.args.get('limit', Config.SESSION_PAGE_SIZE, type=int)
+    return max(1, min(limit, Config.MAX_SESSION_PAGE_SIZE))
 
 # Serve the frontend
 @app.route('/')
 def index():
-    # We'll use a template string for now; can move to a file later
-    return render_template_string(open('templates/index.html').read())
+    # Compiled and rendered once; redone only when the template or an asset it links to changes
+    return send_cached(index_page.render(), 'no-cache')
 
 # Chat endpoint
 @app.route('/chat', methods=['POST'])
@@ -35,63 +126,269 @@ def chat():
     session_id = data.get('session_id')
     if not session_id or session_id not in sessions:
         return jsonify({'error': 'Invalid session'}), 400
-    history = sessions[session_id]['history']
-    # Call the chatbot (sync for now)
-    import asyncio
-    result = asyncio.run(chatbot.chat(message, history))
-    # Add to history
-    sessions[session_id]['history'].append({
+    ticket, shed_reason = admission.acquire(session_id)
+    if ticket is None:
+        return shed_response(session_id, message, shed_reason)
+    profile_mode = profiler.requested_mode(request.headers, session_id)
+    profile_id = None
+    try:
+        history = sessions.recent_history(session_id, Config.SESSION_CONTEXT_TURNS)
+        started = time.perf_counter()
+        try:
+            if profile_mode:
+                result, profile_id = run_async(profiled_chat(profile_mode, session_id, message, history))
+            else:
+                result = run_async(chatbot.chat(message, history))
+        except TimeoutError:
+            result = timed_out_result()
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    finally:
+        admission.release(ticket)
+    result['queue_wait_ms'] = round(ticket.wait_ms, 1)
+    if cacheable(result):
+        answer_cache.put(message, result, history)
+    record_turn(session_id, message, result)
+    resp = jsonify(result)
+    if profile_id:
+        resp.headers['X-Profile-Id'] = profile_id
+    return resp
+
+async def profiled_chat(mode, session_id, message, history):
+    async with profiler.capture(mode, {'session_id': session_id, 'message': message[:200]}) as profile_id:
+        result = await chatbot.chat(message, history)
+    return result, profile_id
+
+async def profiled_stream(mode, session_id, message, history):
+    """chat_stream inside a profile capture; the first item yielded is the capture's profile id"""
+    async with profiler.capture(mode, {'session_id': session_id, 'message': message[:200]}) as profile_id:
+        yield profile_id
+        async with contextlib.aclosing(chatbot.chat_stream(message, history)) as events:
+            async for event in events:
+                yield event
+
+def iterate_async(agen):
+    """Drive an async generator on the shared event loop from a sync (streamed response) generator"""
+    async def next_event():
+        return await agen.__anext__()
+    try:
+        while True:
+            try:
+                yield run_async(next_event())
+            except StopAsyncIteration:
+                return
+    finally:
+        run_async(agen.aclose())
+
+# Streaming chat: one NDJSON line per perspective section as it's ready, then the final result
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.get_json(force=True) or {}
+    message = data.get('message', '')
+    session_id = data.get('session_id')
+    if not session_id or session_id not in sessions:
+        return jsonify({'error': 'Invalid session'}), 400
+    ticket, shed_reason = admission.acquire(session_id)
+    if ticket is None:
+        return shed_response(session_id, message, shed_reason)
+    profile_mode = profiler.requested_mode(request.headers, session_id)
+    profile_id = None
+    started = time.perf_counter()
+    try:
+        history = sessions.recent_history(session_id, Config.SESSION_CONTEXT_TURNS)
+        if profile_mode:
+            events = profiled_stream(profile_mode, session_id, message, history)
+            # Starts the capture, so its id can go in the response headers
+            profile_id = run_async(events.__anext__())
+        else:
+            events = chatbot.chat_stream(message, history)
+    except BaseException:
+        admission.release(ticket)
+        raise
+
+    def finish(result):
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        result['queue_wait_ms'] = round(ticket.wait_ms, 1)
+        if cacheable(result):
+            answer_cache.put(message, result, history)
+        record_turn(session_id, message, result)
+
+    def generate():
+        try:
+            for event in iterate_async(events):
+                if event['type'] == 'result':
+                    finish(event['result'])
+                yield json.dumps(event) + "\n"
+        except TimeoutError:
+            result = timed_out_result()
+            finish(result)
+            yield json.dumps({'type': 'result', 'result': result}) + "\n"
+
+    def close():
+        try:
+            # A stream that was never iterated still has to end its profile capture
+            run_async(events.aclose())
+        finally:
+            admission.release(ticket)
+
+    resp = Response(generate(), mimetype='application/x-ndjson')
+    # Runs when the response is closed, even if the client went away before reading it
+    resp.call_on_close(close)
+    if profile_id:
+        resp.headers['X-Profile-Id'] = profile_id
+    return resp
+
+def cacheable(result):
+    """Only complete political answers are served again to shed requests"""
+    return result.get('is_political') and not result.get('error') and not result.get('partial')
+
+def record_turn(session_id, message, result):
+    # Add to history, with the fields the conversation analytics count
+    turn = {
         'message': message,
         'response': result['response'],
         'is_political': result.get('is_political', False),
         'timestamp': result.get('timestamp', '')
+    }
+    for key in ('confidence_score', 'latency_ms', 'source_types', 'error', 'partial', 'cached'):
+        if result.get(key) is not None:
+            turn[key] = result[key]
+    sessions.append_turn(session_id, turn)
+
+def shed_response(session_id, message, reason):
+    """Under overload: a recent answer to the same question in the same context if we have one, else a fast 'busy'"""
+    cached = answer_cache.get(message, sessions.recent_history(session_id, Config.SESSION_CONTEXT_TURNS))
+    if cached is not None:
+        result = dict(cached, cached=True, latency_ms=0.0)
+        record_turn(session_id, message, result)
+        return jsonify(result)
+    retry_after = admission.retry_after()
+    resp = jsonify({
+        'error': 'The service is busy, please try again shortly.',
+        'busy': True,
+        'reason': reason,
+        'retry_after': retry_after
     })
-    save_sessions()
-    return jsonify(result)
+    resp.status_code = 503
+    resp.headers['Retry-After'] = str(retry_after)
+    return resp
 
 # List/create/delete sessions
 @app.route('/sessions', methods=['GET', 'POST'])
 def session_list():
     if request.method == 'POST':
         # Create new session
-        session_id = str(uuid.uuid4())
-        sessions[session_id] = {'history': []}
-        save_sessions()
+        session_id = sessions.create()
         return jsonify({'session_id': session_id})
     else:
-        # List sessions
-        return jsonify([
-            {'session_id': sid, 'length': len(s["history"])}
-            for sid, s in sessions.items()
-        ])
-
-@app.route('/sessions/<session_id>', methods=['DELETE'])
-def delete_session(session_id):
-    if session_id in sessions:
-        del sessions[session_id]
-        save_sessions()
-        return '', 204
-    return jsonify({'error': 'Session not found'}), 404
-
-# Get summary for a session
+        # List sessions, newest first, one page at a time
+        cursor = request.args.get('cursor')
+        limit = page_limit()
+        def build():
+            items, next_cursor = sessions.page(cursor, limit)
+            return {'sessions': items, 'next_cursor': next_cursor, 'total': len(sessions)}
+        return cached_json(sessions.list_etag(cursor, limit), build)
+
+@app.route('/sessions/<session_id>', methods=['GET', 'DELETE'])
+def session_detail(session_id):
+    if request.method == 'DELETE':
+        if sessions.delete(session_id):
+            return '', 204
+        return jsonify({'error': 'Session not found'}), 404
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
+    # Session metadata plus the turns the client doesn't have yet
+    since = request.args.get('since', 0, type=int)
+    def build():
+        detail = sessions.describe(session_id)
+        detail['since'] = since
+        detail['history'] = sessions.history_since(session_id, since)
+        return detail
+    return cached_json(sessions.session_etag(session_id), build)
+
+# Get summary for a session (counters are kept as turns are appended, no history scan)
 @app.route('/summary/<session_id>')
 def summary(session_id):
     if session_id not in sessions:
         return jsonify({'error': 'Invalid session'}), 400
-    summary = chatbot.get_conversation_summary(sessions[session_id]['history'])
-    return jsonify(summary)
+    return jsonify(sessions.session_summary(session_id))
 
-# Get history for a session
+# Summary across all sessions
+@app.route('/summary')
+def global_summary():
+    return jsonify(sessions.global_summary())
+
+# Get history for a session (optionally only turns after index `since`)
 @app.route('/sessions/<session_id>/history')
 def session_history(session_id):
     if session_id not in sessions:
         return jsonify({'error': 'Invalid session'}), 400
-    return jsonify(sessions[session_id]['history'])
+    since = request.args.get('since', 0, type=int)
+    return cached_json(sessions.session_etag(session_id),
+                       lambda: sessions.history_since(session_id, since))
+
+# Queue depth, wait times and shed counts for /chat
+@app.route('/metrics/admission')
+def admission_metrics():
+    return jsonify(admission.metrics())
+
+# Per-stage model cost/latency telemetry and model health
+@app.route('/metrics/models')
+def model_metrics():
+    return jsonify(chatbot.router.snapshot())
+
+# Resident session memory against its cap, and cache fault/eviction counts
+@app.route('/metrics/sessions')
+def session_metrics():
+    return jsonify(sessions.memory_metrics())
+
+def require_profile_token():
+    # Hidden entirely unless PROFILE_TOKEN is configured
+    if not profiler.enabled:
+        abort(404)
+    if not profiler.authorized(request.headers.get('X-Profile-Token')):
+        abort(403)
+
+# Arm profiling of the next /chat requests, check what is armed, or cancel it
+@app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+def profile_control():
+    require_profile_token()
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            return jsonify(profiler.arm(int(data.get('count', 1)), data.get('mode', 'cprofile'), data.get('session_id')))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    if request.method == 'DELETE':
+        profiler.disarm()
+    return jsonify(profiler.status())
+
+# Saved captures, newest first
+@app.route('/admin/profiles')
+def profile_list():
+    require_profile_token()
+    return jsonify({'profiles': profiler.list()})
+
+# Download one artifact of a capture (profile.pstats, stacks.folded, allocations.txt, ...)
+@app.route('/admin/profiles/<profile_id>/<name>')
+def profile_artifact(profile_id, name):
+    require_profile_token()
+    path = profiler.artifact_path(profile_id, name)
+    if path is None:
+        abort(404)
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=f"{profile_id}-{name}")
 
 # Serve static files (JS/CSS)
 @app.route('/static/<path:path>')
 def send_static(path):
-    return send_from_directory('static', path)
+    asset = assets.get(path)
+    if asset is None:
+        return jsonify({'error': 'Not found'}), 404
+    if request.args.get('v') == asset.digest:
+        # Fingerprinted URL: the content behind it can never change
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        cache_control = 'no-cache'
+    return send_cached(asset, cache_control)
 
 if __name__ == '__main__':
     os.makedirs('templates', exist_ok=True)
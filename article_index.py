@@ -0,0 +1,203 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from settings import Config
+
+STOPWORDS = {
+    'a', 'about', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'did', 'do', 'does', 'for', 'from',
+    'has', 'have', 'he', 'her', 'his', 'how', 'in', 'is', 'it', 'its', 'me', 'of', 'on', 'or',
+    'she', 'tell', 'that', 'the', 'their', 'them', 'they', 'this', 'to', 'was', 'were', 'what',
+    'when', 'where', 'which', 'who', 'why', 'will', 'with', 'would', 'you'
+}
+
+
+def _news_item(article: Dict) -> Dict[str, Any]:
+    return {
+        'url': article.get('url'),
+        'title': article.get('title') or '',
+        'body': article.get('description') or '',
+        'source': (article.get('source') or {}).get('name', 'NewsAPI'),
+        'published_at': article.get('publishedAt'),
+    }
+
+
+def _guardian_item(article: Dict) -> Dict[str, Any]:
+    fields = article.get('fields') or {}
+    return {
+        'url': article.get('webUrl'),
+        'title': article.get('webTitle') or '',
+        'body': fields.get('trailText') or '',
+        'source': 'The Guardian',
+        'published_at': article.get('webPublicationDate'),
+    }
+
+
+def _serper_item(result: Dict) -> Dict[str, Any]:
+    return {
+        'url': result.get('link'),
+        'title': result.get('title') or '',
+        'body': result.get('snippet') or '',
+        'source': 'Serper',
+        'published_at': result.get('date'),
+    }
+
+
+def _brave_item(result: Dict) -> Dict[str, Any]:
+    return {
+        'url': result.get('url'),
+        'title': result.get('title') or '',
+        'body': result.get('description') or '',
+        'source': 'Brave',
+        'published_at': result.get('page_age'),
+    }
+
+
+# Keys of DataAggregator's result that the index stores, and how to read each one
+NORMALIZERS: Dict[str, Callable[[Dict], Dict[str, Any]]] = {
+    'news_articles': _news_item,
+    'guardian_articles': _guardian_item,
+    'search_results': _serper_item,
+    'brave_results': _brave_item,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    source TEXT,
+    title TEXT,
+    body TEXT,
+    published_at TEXT,
+    fetched_at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, body, content='articles', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    INSERT INTO articles_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+"""
+
+
+def query_terms(query: str) -> List[str]:
+    terms = []
+    for term in re.findall(r"\w+", query.lower()):
+        if term not in STOPWORDS and len(term) > 1 and term not in terms:
+            terms.append(term)
+    return terms
+
+
+class ArticleIndex:
+    """Persistent SQLite FTS5 index of every article and search result retrieved upstream"""
+
+    def __init__(self, path: str = Config.ARTICLE_INDEX_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def ingest(self, data: Dict[str, Any]) -> int:
+        """Store (or refresh) every item under the indexed keys of an aggregator result"""
+        now = time.time()
+        rows = []
+        for kind, normalize in NORMALIZERS.items():
+            for raw in data.get(kind) or []:
+                if not isinstance(raw, dict):
+                    continue
+                item = normalize(raw)
+                if not item['url']:
+                    continue
+                rows.append((item['url'], kind, item['source'], item['title'], item['body'],
+                             item['published_at'], now, json.dumps(raw, ensure_ascii=False)))
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO articles (url, kind, source, title, body, published_at, fetched_at, payload)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    kind=excluded.kind, source=excluded.source, title=excluded.title, body=excluded.body,
+                    published_at=excluded.published_at, fetched_at=excluded.fetched_at, payload=excluded.payload
+            """, rows)
+        return len(rows)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """BM25-ranked matches (title weighted over body), best first"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT a.id, a.kind, a.title, a.body, a.fetched_at, a.payload, bm25(articles_fts, 5.0, 1.0) AS score
+                FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+                WHERE articles_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+            """, (match, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _matching_terms(self, terms: List[str], ids: List[int]) -> Dict[int, int]:
+        """
+        How many of `terms` each article in `ids` contains, as whole words under the FTS table's own
+        tokenizer and porter stemming (so 'elections' counts for 'election', and 'war' not for 'award')
+        """
+        counts = dict.fromkeys(ids, 0)
+        placeholders = ','.join('?' * len(ids))
+        with self._lock:
+            for term in terms:
+                for row in self._conn.execute(
+                        f"SELECT rowid FROM articles_fts WHERE articles_fts MATCH ? AND rowid IN ({placeholders})",
+                        (f'"{term}"', *ids)):
+                    counts[row[0]] += 1
+        return counts
+
+    def lookup(self, query: str) -> Optional[Dict[str, List[Dict]]]:
+        """
+        Answer a retrieval from the index if local coverage is good enough
+        Returns: payloads grouped by aggregator key, or None when coverage is thin or stale
+        """
+        terms = query_terms(query)
+        if not terms:
+            return None
+        oldest_allowed = time.time() - Config.ARTICLE_INDEX_MAX_AGE_HOURS * 3600
+        hits = [hit for hit in self.search(query, limit=Config.ARTICLE_INDEX_SEARCH_LIMIT)
+                if hit['fetched_at'] >= oldest_allowed]
+        if len(hits) < Config.ARTICLE_INDEX_MIN_HITS:
+            return None
+        # OR-matching lets one common word through, so require real term overlap to count as coverage
+        matched = self._matching_terms(terms, [hit['id'] for hit in hits])
+        grouped: Dict[str, List[Dict]] = {kind: [] for kind in NORMALIZERS}
+        relevant = 0
+        for hit in hits:
+            if matched[hit['id']] / len(terms) < Config.ARTICLE_INDEX_MIN_TERM_OVERLAP:
+                continue
+            relevant += 1
+            grouped[hit['kind']].append(json.loads(hit['payload']))
+        if relevant < Config.ARTICLE_INDEX_MIN_HITS:
+            return None
+        return grouped
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from settings import Config
+from politics_bot import PoliticsChatbotAgentic
+
+
+def iter_questions(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Stream (line_number, record) pairs from a JSONL file without loading it all"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping malformed line {line_no}: {e}")
+
+
+def get_question(record: Dict[str, Any], field: Optional[str] = None) -> str:
+    """Pick the question text out of a record"""
+    fields = [field] if field else Config.BATCH_QUESTION_FIELDS
+    for name in fields:
+        value = record.get(name)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ""
+
+
+def get_item_id(record: Dict[str, Any], line_no: int, field: Optional[str] = None) -> str:
+    """Pick a stable id for a record, falling back to its line number"""
+    fields = [field] if field else Config.BATCH_ID_FIELDS
+    for name in fields:
+        value = record.get(name)
+        if value is not None and value != "":
+            return str(value)
+    return f"line-{line_no}"
+
+
+def load_completed_ids(output_path: str) -> Set[str]:
+    """Ids already answered successfully in a previous (possibly interrupted) run"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+            if entry.get('status') == 'ok':
+                completed.add(entry.get('id'))
+    return completed
+
+
+class SharedRetrievalCache:
+    """Memoizes retrieval per normalized query so duplicate questions share one upstream fan-out"""
+
+    def __init__(self, aggregator):
+        self.aggregator = aggregator
+        self._fetch = aggregator.get_comprehensive_political_data
+        self._results: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_comprehensive_political_data(self, query: str) -> Dict[str, Any]:
+        key = " ".join(query.lower().split())
+        future = self._results.get(key)
+        if future is not None:
+            self.hits += 1
+            return await asyncio.shield(future)
+        self.misses += 1
+        future = asyncio.ensure_future(self._fetch(query))
+        self._results[key] = future
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            # Don't pin failures in the cache; the next duplicate retries
+            self._results.pop(key, None)
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self.aggregator, name)
+
+
+class BatchRunner:
+    """Runs JSONL questions through one shared chatbot with bounded concurrency"""
+
+    def __init__(self, input_path: str, output_path: str, concurrency: int = Config.BATCH_CONCURRENCY,
+                 question_field: Optional[str] = None, id_field: Optional[str] = None,
+                 chatbot: Optional[PoliticsChatbotAgentic] = None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency)
+        self.question_field = question_field
+        self.id_field = id_field
+        self.chatbot = chatbot or PoliticsChatbotAgentic()
+        self.retrieval_cache = SharedRetrievalCache(self.chatbot.data_aggregator)
+        self.chatbot.data_aggregator = self.retrieval_cache
+        self.stats = {'ok': 0, 'error': 0, 'skipped': 0}
+
+    async def run(self) -> Dict[str, Any]:
+        completed = load_completed_ids(self.output_path)
+        # Queue is bounded so the input file is read only as fast as workers drain it
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        write_lock = asyncio.Lock()
+        started = time.perf_counter()
+        with open(self.output_path, 'a', encoding='utf-8') as out:
+            workers = [
+                asyncio.create_task(self._worker(queue, out, write_lock))
+                for _ in range(self.concurrency)
+            ]
+            seen = set()
+            for line_no, record in iter_questions(self.input_path):
+                item_id = get_item_id(record, line_no, self.id_field)
+                if item_id in completed or item_id in seen:
+                    self.stats['skipped'] += 1
+                    continue
+                seen.add(item_id)
+                await queue.put((item_id, record))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        self.stats['elapsed_s'] = round(time.perf_counter() - started, 3)
+        self.stats['retrieval_cache_hits'] = self.retrieval_cache.hits
+        return self.stats
+
+    async def _worker(self, queue: asyncio.Queue, out, write_lock: asyncio.Lock):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            item_id, record = item
+            entry = await self._run_one(item_id, record)
+            async with write_lock:
+                out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                out.flush()
+            self.stats[entry['status']] += 1
+            print(f"[{entry['status']}] {item_id} ({entry['elapsed_ms']} ms)")
+
+    async def _run_one(self, item_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        question = get_question(record, self.question_field)
+        entry = {
+            'id': item_id,
+            'question': question,
+            'started_at': datetime.now().isoformat(),
+        }
+        start = time.perf_counter()
+        if not question:
+            entry.update({'status': 'error', 'error': 'No question text found', 'elapsed_ms': 0})
+            return entry
+        try:
+            result = await self.chatbot.chat(question, [])
+        except Exception as e:
+            result = {'response': str(e), 'error': True}
+        entry['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        entry['status'] = 'error' if result.get('error') else 'ok'
+        entry['result'] = result
+        return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of questions through the chatbot")
+    parser.add_argument('input', help="JSONL file with one question per line")
+    parser.add_argument('output', help="JSONL file to append results to (re-run to resume)")
+    parser.add_argument('-c', '--concurrency', type=int, default=Config.BATCH_CONCURRENCY)
+    parser.add_argument('--field', help="Record field holding the question text")
+    parser.add_argument('--id-field', help="Record field holding a unique id")
+    args = parser.parse_args()
+    runner = BatchRunner(args.input, args.output, args.concurrency, args.field, args.id_field)
+    stats = asyncio.run(runner.run())
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+# Run in a fresh interpreter each time so nothing is already imported or cached
+TIME_TO_FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.get('/sessions')
+served = time.perf_counter()
+print(f"{(imported - start) * 1000:.1f} {(served - start) * 1000:.1f}")
+"""
+
+
+def profile_imports(module: str = "app") -> Tuple[float, List[Tuple[float, float, str]]]:
+    """
+    Import `module` under -X importtime
+    Returns: (total_ms, [(cumulative_ms, self_ms, module_name), ...])
+    """
+    env = dict(os.environ, BACKGROUND_WARM_UP="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us) / 1000, int(self_us) / 1000, name.rstrip()))
+    total = next((cum for cum, _, name in rows if name.strip() == module), 0.0)
+    return total, rows
+
+
+def time_to_first_request(runs: int = 5) -> List[Tuple[float, float]]:
+    """(import_ms, first_response_ms) for each fresh-process run"""
+    env = dict(os.environ, BACKGROUND_WARM_UP="0")
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", TIME_TO_FIRST_REQUEST],
+                              capture_output=True, text=True, env=env, check=True)
+        imported, served = proc.stdout.split()[-2:]
+        results.append((float(imported), float(served)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import time and time-to-first-request")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    total, rows = profile_imports()
+    print(f"import app: {total:.1f} ms")
+    print(f"\nTop {args.top} imports by cumulative time:")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, self_ms, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative:14.1f} {self_ms:9.1f}  {name}")
+
+    results = time_to_first_request(args.runs)
+    imports = sorted(r[0] for r in results)
+    served = sorted(r[1] for r in results)
+    print(f"\nTime to first request over {args.runs} runs (median): "
+          f"import {imports[len(imports) // 2]:.1f} ms, first response {served[len(served) // 2]:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from settings import Config
+
+
+class ConversationStats:
+    """Running counters for a set of turns; adding a turn is O(1), so is reading the summary"""
+
+    def __init__(self):
+        self.total = 0
+        self.political = 0
+        self.refusals = 0
+        self.errors = 0
+        # Political answers missing sections that failed to generate
+        self.partial = 0
+        self.cached = 0
+        self.confidence_sum = 0.0
+        self.confidence_count = 0
+        self.latency_ms_sum = 0.0
+        self.latency_count = 0
+        self.source_usage: Counter = Counter()
+
+    @classmethod
+    def from_turns(cls, turns: List[Dict[str, Any]]) -> 'ConversationStats':
+        stats = cls()
+        for turn in turns:
+            stats.add_turn(turn)
+        return stats
+
+    def add_turn(self, turn: Dict[str, Any]):
+        self.total += 1
+        if turn.get('error'):
+            self.errors += 1
+        elif turn.get('is_political', False):
+            self.political += 1
+            if turn.get('partial'):
+                self.partial += 1
+            if turn.get('confidence_score') is not None:
+                self.confidence_sum += turn['confidence_score']
+                self.confidence_count += 1
+            self.source_usage.update(turn.get('source_types') or [])
+        else:
+            # Every non-political question gets the fixed refusal
+            self.refusals += 1
+        if turn.get('cached'):
+            self.cached += 1
+        if turn.get('latency_ms') is not None:
+            self.latency_ms_sum += turn['latency_ms']
+            self.latency_count += 1
+
+    def merge(self, other: 'ConversationStats', sign: int = 1):
+        """Add (or with sign=-1, subtract) another set of counters, e.g. a deleted session's"""
+        for name in ('total', 'political', 'refusals', 'errors', 'partial', 'cached', 'confidence_sum',
+                     'confidence_count', 'latency_ms_sum', 'latency_count'):
+            setattr(self, name, getattr(self, name) + sign * getattr(other, name))
+        for source, count in other.source_usage.items():
+            self.source_usage[source] += sign * count
+        self.source_usage = +self.source_usage
+
+    def summary(self) -> Dict[str, Any]:
+        total = self.total
+        return {
+            "total_queries": total,
+            "political_queries": self.political,
+            # Every non-political question is refused; errored turns are only counted under "errors"
+            "non_political_queries": self.refusals,
+            "political_percentage": (self.political / total * 100) if total > 0 else 0,
+            "refusals": self.refusals,
+            "errors": self.errors,
+            "partial_answers": self.partial,
+            "cached_answers": self.cached,
+            "average_confidence": round(self.confidence_sum / self.confidence_count, 2) if self.confidence_count else None,
+            "average_latency_ms": round(self.latency_ms_sum / self.latency_count, 1) if self.latency_count else None,
+            "source_usage": dict(self.source_usage.most_common()),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(vars(self))
+        data['source_usage'] = dict(self.source_usage)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ConversationStats':
+        stats = cls()
+        for name, value in data.items():
+            if hasattr(stats, name):
+                setattr(stats, name, value)
+        stats.source_usage = Counter(data.get('source_usage') or {})
+        return stats
+
+
+class StatsRegistry:
+    """Per-session and global ConversationStats, kept in step with the session store"""
+
+    def __init__(self):
+        self.sessions: Dict[str, ConversationStats] = {}
+        self.global_stats = ConversationStats()
+        self._lock = threading.Lock()
+
+    def record(self, session_id: str, turn: Dict[str, Any]):
+        with self._lock:
+            self.sessions.setdefault(session_id, ConversationStats()).add_turn(turn)
+            self.global_stats.add_turn(turn)
+
+    def add_session(self, session_id: str, turns: List[Dict[str, Any]] = ()):
+        with self._lock:
+            stats = ConversationStats.from_turns(turns)
+            self.sessions[session_id] = stats
+            self.global_stats.merge(stats)
+
+    def drop(self, session_id: str):
+        with self._lock:
+            stats = self.sessions.pop(session_id, None)
+            if stats is not None:
+                self.global_stats.merge(stats, sign=-1)
+
+    def session_summary(self, session_id: str) -> Dict[str, Any]:
+        stats = self.sessions.get(session_id) or ConversationStats()
+        return stats.summary()
+
+    def global_summary(self) -> Dict[str, Any]:
+        summary = self.global_stats.summary()
+        summary['sessions'] = len(self.sessions)
+        return summary
+
+    def save(self, path: str):
+        with self._lock:
+            data = {
+                'global': self.global_stats.to_dict(),
+                'sessions': {sid: stats.to_dict() for sid, stats in self.sessions.items()},
+            }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['StatsRegistry']:
+        """Saved counters, or None if missing; the session store checks them against its files on load"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        registry = cls()
+        registry.global_stats = ConversationStats.from_dict(data.get('global') or {})
+        registry.sessions = {sid: ConversationStats.from_dict(stats) for sid, stats in data.get('sessions', {}).items()}
+        return registry
+
+
+def iter_session_file(path: str, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream (session_id, session) pairs out of a sessions JSON object one session at a time
+    Only the session being decoded is held in memory, not the whole file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf, pos = '', 0
+
+        def fill() -> bool:
+            nonlocal buf, pos
+            # Read at least as much as is buffered so re-decoding a large value stays linear overall
+            chunk = f.read(max(chunk_size, len(buf) - pos))
+            if not chunk:
+                return False
+            buf, pos = buf[pos:] + chunk, 0
+            return True
+
+        def next_char() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not fill():
+                    return ''
+
+        def next_value():
+            nonlocal pos
+            next_char()
+            while True:
+                try:
+                    value, pos = decoder.raw_decode(buf, pos)
+                    return value
+                except json.JSONDecodeError:
+                    if not fill():
+                        raise
+
+        if next_char() != '{':
+            raise ValueError(f"{path} does not contain a JSON object")
+        pos += 1
+        while True:
+            char = next_char()
+            if char == '}' or char == '':
+                return
+            if char == ',':
+                pos += 1
+                continue
+            session_id = next_value()
+            if next_char() != ':':
+                raise ValueError(f"Malformed session file near session {session_id!r}")
+            pos += 1
+            yield session_id, next_value()
+
+
+def rebuild(sessions_dir: str, legacy_path: Optional[str] = None) -> StatsRegistry:
+    """Regenerate all counters from the session store, reading each session file once"""
+    # Imported here: session_store itself builds on this module
+    from session_store import SessionStore
+    # Without a stats file to start from, loading the store counts every session
+    store = SessionStore(sessions_dir, legacy_path=legacy_path)
+    store.load()
+    return store.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation analytics for the session store")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('rebuild', help="Regenerate the stats file from the session store")
+    sub.add_parser('show', help="Print the global summary")
+    parser.add_argument('--sessions', default=Config.SESSION_DIR)
+    parser.add_argument('--legacy', default='sessions.json', help="Single-file store to import if --sessions is empty")
+    parser.add_argument('--stats', default=Config.SESSION_STATS_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        registry = rebuild(args.sessions, args.legacy)
+        registry.save(args.stats)
+    else:
+        registry = StatsRegistry.load(args.stats) or rebuild(args.sessions, args.legacy)
+    print(json.dumps(registry.global_summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import asyncio
+import html
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional
+import xml.etree.ElementTree as ET
+
+from settings import Config
+from article_index import query_terms
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+TAG_RE = re.compile(r'<[^>]+>')
+WORD_RE = re.compile(r'\w+')
+
+
+def _text(element: Optional[ET.Element]) -> str:
+    if element is None or element.text is None:
+        return ''
+    return html.unescape(TAG_RE.sub('', element.text)).strip()
+
+
+def _iso_date(value: str) -> str:
+    """Normalize RSS (RFC 822) or Atom (ISO 8601) dates to ISO 8601"""
+    if not value:
+        return ''
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        return value
+
+
+def _rss_item(element: ET.Element, source: str) -> Dict[str, Any]:
+    return {
+        'title': _text(element.find('title')),
+        'url': _text(element.find('link')) or _text(element.find('guid')),
+        'source': source,
+        'description': _text(element.find('description'))[:500],
+        'publishedAt': _iso_date(_text(element.find('pubDate'))),
+    }
+
+
+def _atom_entry(element: ET.Element, source: str) -> Dict[str, Any]:
+    url = ''
+    for link in element.findall(f'{ATOM}link'):
+        if link.get('rel', 'alternate') == 'alternate':
+            url = link.get('href', '')
+            break
+    summary = element.find(f'{ATOM}summary')
+    if summary is None:
+        summary = element.find(f'{ATOM}content')
+    published = element.find(f'{ATOM}published')
+    if published is None:
+        published = element.find(f'{ATOM}updated')
+    return {
+        'title': _text(element.find(f'{ATOM}title')),
+        'url': url or _text(element.find(f'{ATOM}id')),
+        'source': source,
+        'description': _text(summary)[:500],
+        'publishedAt': _text(published),
+    }
+
+
+class FeedParser:
+    """Incremental RSS/Atom parser: feed it byte chunks, collect items as each one closes"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self._parser = ET.XMLPullParser(events=('end',))
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        items = []
+        for _, element in self._parser.read_events():
+            if element.tag == 'item':
+                items.append(_rss_item(element, self.source))
+            elif element.tag == f'{ATOM}entry':
+                items.append(_atom_entry(element, self.source))
+            else:
+                continue
+            # Drop the parsed subtree so a large feed doesn't accumulate in memory
+            element.clear()
+        return [item for item in items if item['url'] and item['title']]
+
+
+class RecentItemsStore:
+    """Bounded, deduplicated in-memory store of recent feed items, searched per query"""
+
+    def __init__(self, max_items: int = Config.FEED_MAX_ITEMS, max_age_hours: float = Config.FEED_MAX_AGE_HOURS):
+        self.max_items = max_items
+        self.max_age = max_age_hours * 3600
+        # url -> (added_at, item, set of lowercased words for matching); oldest first
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, items: Iterable[Dict[str, Any]]) -> int:
+        added = 0
+        now = time.time()
+        with self._lock:
+            for item in items:
+                key = item['url'].split('#')[0].rstrip('/')
+                if key in self._items:
+                    continue
+                words = frozenset(WORD_RE.findall(f"{item['title']} {item['description']}".lower()))
+                self._items[key] = (now, item, words)
+                added += 1
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return added
+
+    def prune(self):
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            while self._items:
+                key, (added_at, _, _) = next(iter(self._items.items()))
+                if added_at >= cutoff:
+                    break
+                del self._items[key]
+
+    def search(self, query: str, limit: int = Config.FEED_RESULTS_PER_QUERY) -> List[Dict[str, Any]]:
+        """Items sharing the most query terms, newest first on ties"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        # Whole words only ('tax' shouldn't match 'syntax'), and enough of them that one common term isn't a match
+        needed = max(1, math.ceil(len(terms) * Config.FEED_MIN_TERM_OVERLAP))
+        scored = []
+        with self._lock:
+            for position, (_, item, words) in enumerate(self._items.values()):
+                matched = sum(1 for term in terms if term in words)
+                if matched >= needed:
+                    scored.append((matched, position, item))
+        scored.sort(key=lambda entry: (entry[0], entry[1]), reverse=True)
+        return [item for _, _, item in scored[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class FeedPoller:
+    """Polls outlet feeds with conditional GETs and bounded concurrency into a RecentItemsStore"""
+
+    def __init__(self, feeds: Dict[str, str], store: RecentItemsStore,
+                 concurrency: int = Config.FEED_POLL_CONCURRENCY, timeout: float = Config.FEED_POLL_TIMEOUT):
+        self.feeds = feeds
+        self.store = store
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # feed url -> validators from the last 200 response
+        self.validators: Dict[str, Dict[str, str]] = {}
+        self.stats = {'polls': 0, 'not_modified': 0, 'errors': 0, 'items_added': 0}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def poll_once(self) -> int:
+        import httpx
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
+            async def bounded(source, url):
+                async with semaphore:
+                    return await self._poll_feed(client, source, url)
+            results = await asyncio.gather(
+                *(bounded(source, url) for source, url in self.feeds.items()),
+                return_exceptions=True
+            )
+        self.store.prune()
+        added = 0
+        for result in results:
+            if isinstance(result, Exception):
+                self.stats['errors'] += 1
+            else:
+                added += result
+        self.stats['items_added'] += added
+        return added
+
+    async def _poll_feed(self, client, source: str, url: str) -> int:
+        headers = {}
+        validators = self.validators.get(url, {})
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        self.stats['polls'] += 1
+        async with client.stream('GET', url, headers=headers) as response:
+            if response.status_code == 304:
+                self.stats['not_modified'] += 1
+                return 0
+            response.raise_for_status()
+            parser = FeedParser(source)
+            added = 0
+            async for chunk in response.aiter_bytes():
+                added += self.store.add(parser.feed(chunk))
+            added += self.store.add(parser.close())
+            self.validators[url] = {
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', ''),
+            }
+        return added
+
+    def start(self, interval: float = Config.FEED_POLL_INTERVAL_SECONDS):
+        """Poll on a schedule from a daemon thread until stop() is called"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                asyncio.run(self.poll_once())
+            except Exception as e:
+                print(f"Error polling feeds: {e}")
+            self._stop.wait(interval)
+
+
+recent_items = RecentItemsStore()
+_poller: Optional[FeedPoller] = None
+_poller_lock = threading.Lock()
+
+
+def start_feed_polling() -> FeedPoller:
+    """Start the shared background poller for Config.POLITICAL_NEWS_FEEDS (idempotent)"""
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = FeedPoller(Config.POLITICAL_NEWS_FEEDS, recent_items)
+            _poller.start()
+    return _poller
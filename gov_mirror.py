@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from settings import Config
+from article_index import query_terms
+
+CONGRESS_BILLS_URL = "https://api.congress.gov/v3/bill"
+FEC_BASE_URL = "https://api.open.fec.gov/v1/"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bills (
+    rowid INTEGER PRIMARY KEY,
+    bill_id TEXT NOT NULL UNIQUE,
+    congress INTEGER,
+    title TEXT,
+    latest_action TEXT,
+    update_date TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bills_update_date ON bills(update_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS bills_fts USING fts5(
+    title, latest_action, content='bills', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS bills_ai AFTER INSERT ON bills BEGIN
+    INSERT INTO bills_fts(rowid, title, latest_action) VALUES (new.rowid, new.title, new.latest_action);
+END;
+CREATE TRIGGER IF NOT EXISTS bills_ad AFTER DELETE ON bills BEGIN
+    INSERT INTO bills_fts(bills_fts, rowid, title, latest_action) VALUES ('delete', old.rowid, old.title, old.latest_action);
+END;
+CREATE TRIGGER IF NOT EXISTS bills_au AFTER UPDATE ON bills BEGIN
+    INSERT INTO bills_fts(bills_fts, rowid, title, latest_action) VALUES ('delete', old.rowid, old.title, old.latest_action);
+    INSERT INTO bills_fts(rowid, title, latest_action) VALUES (new.rowid, new.title, new.latest_action);
+END;
+
+CREATE TABLE IF NOT EXISTS fec_records (
+    rowid INTEGER PRIMARY KEY,
+    record_id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    name TEXT,
+    description TEXT,
+    last_file_date TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fec_last_file_date ON fec_records(kind, last_file_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS fec_fts USING fts5(
+    name, description, content='fec_records', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS fec_ai AFTER INSERT ON fec_records BEGIN
+    INSERT INTO fec_fts(rowid, name, description) VALUES (new.rowid, new.name, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS fec_ad AFTER DELETE ON fec_records BEGIN
+    INSERT INTO fec_fts(fec_fts, rowid, name, description) VALUES ('delete', old.rowid, old.name, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS fec_au AFTER UPDATE ON fec_records BEGIN
+    INSERT INTO fec_fts(fec_fts, rowid, name, description) VALUES ('delete', old.rowid, old.name, old.description);
+    INSERT INTO fec_fts(rowid, name, description) VALUES (new.rowid, new.name, new.description);
+END;
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    records INTEGER NOT NULL DEFAULT 0,
+    complete INTEGER NOT NULL DEFAULT 0,
+    resume_page INTEGER,
+    pending_watermark TEXT
+);
+"""
+
+# Added to sync_state after the first release; ALTERed into existing databases
+SYNC_STATE_COLUMNS = {
+    'complete': "INTEGER NOT NULL DEFAULT 0",
+    'resume_page': "INTEGER",
+    'pending_watermark': "TEXT",
+}
+
+
+def _fts_match(query: str) -> Optional[str]:
+    terms = query_terms(query)
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class GovernmentMirror:
+    """Local SQLite mirror of Congress.gov bills and FEC candidates/committees"""
+
+    def __init__(self, path: str = Config.GOV_MIRROR_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(sync_state)")}
+            for column, declaration in SYNC_STATE_COLUMNS.items():
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE sync_state ADD COLUMN {column} {declaration}")
+
+    # Sync state
+
+    def state(self, resource: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sync_state WHERE resource = ?", (resource,)).fetchone()
+        return dict(row) if row else None
+
+    def watermark(self, resource: str) -> Optional[str]:
+        state = self.state(resource)
+        return state['watermark'] if state else None
+
+    def has_synced(self, resource: str) -> bool:
+        """True once a full pass over the resource's change window has finished, not after the first page"""
+        state = self.state(resource)
+        return bool(state and state['complete'])
+
+    def save_progress(self, resource: str, watermark: str, records: int, complete: bool = False,
+                      resume_page: Optional[int] = None, pending_watermark: Optional[str] = None):
+        """
+        Record how far a sync got
+        `complete` marks a finished pass and sticks once set. `resume_page`/`pending_watermark` let a
+        newest-first sync that hit the page cap continue where it stopped without moving the watermark.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO sync_state (resource, watermark, synced_at, records, complete, resume_page, pending_watermark)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(resource) DO UPDATE SET
+                    watermark=excluded.watermark, synced_at=excluded.synced_at,
+                    records=sync_state.records + excluded.records,
+                    complete=MAX(sync_state.complete, excluded.complete),
+                    resume_page=excluded.resume_page, pending_watermark=excluded.pending_watermark
+            """, (resource, watermark, time.time(), records, int(complete), resume_page, pending_watermark))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM sync_state").fetchall()
+            bills = self._conn.execute("SELECT COUNT(*) FROM bills").fetchone()[0]
+            fec = self._conn.execute("SELECT COUNT(*) FROM fec_records").fetchone()[0]
+        return {
+            'bills': bills,
+            'fec_records': fec,
+            'resources': {row['resource']: {
+                'watermark': row['watermark'],
+                'synced_at': datetime.fromtimestamp(row['synced_at']).isoformat(),
+                'records_synced': row['records'],
+                'complete': bool(row['complete']),
+                'resume_page': row['resume_page'],
+            } for row in rows},
+        }
+
+    # Upserts
+
+    def upsert_bills(self, bills: List[Dict[str, Any]]):
+        rows = []
+        for bill in bills:
+            bill_id = f"{bill.get('congress')}-{str(bill.get('type', '')).lower()}-{bill.get('number')}"
+            latest = bill.get('latestAction') or {}
+            rows.append((bill_id, bill.get('congress'), bill.get('title') or '', latest.get('text') or '',
+                         bill.get('updateDate') or '', json.dumps(bill, ensure_ascii=False)))
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO bills (bill_id, congress, title, latest_action, update_date, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(bill_id) DO UPDATE SET
+                    congress=excluded.congress, title=excluded.title, latest_action=excluded.latest_action,
+                    update_date=excluded.update_date, payload=excluded.payload
+            """, rows)
+
+    def upsert_fec(self, kind: str, records: List[Dict[str, Any]]) -> int:
+        rows = []
+        for record in records:
+            record_id = record.get('candidate_id') if kind == 'candidate' else record.get('committee_id')
+            if not record_id:
+                continue
+            description = " ".join(filter(None, [
+                record.get('party_full'), record.get('office_full'), record.get('committee_type_full'),
+                record.get('state'), " ".join(str(year) for year in record.get('election_years') or [])
+            ]))
+            rows.append((record_id, kind, record.get('name') or '', description,
+                         record.get('last_file_date') or '', json.dumps(record, ensure_ascii=False)))
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO fec_records (record_id, kind, name, description, last_file_date, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(record_id) DO UPDATE SET
+                    kind=excluded.kind, name=excluded.name, description=excluded.description,
+                    last_file_date=excluded.last_file_date, payload=excluded.payload
+            """, rows)
+        return len(rows)
+
+    # Queries
+
+    def search_bills(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        match = _fts_match(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT b.payload, b.latest_action FROM bills_fts JOIN bills b ON b.rowid = bills_fts.rowid
+                WHERE bills_fts MATCH ?
+                ORDER BY bm25(bills_fts, 5.0, 1.0), b.update_date DESC
+                LIMIT ?
+            """, (match, limit)).fetchall()
+        bills = []
+        for row in rows:
+            bill = json.loads(row['payload'])
+            # The prompt context reads 'summary' from government data
+            bill.setdefault('summary', row['latest_action'])
+            bills.append(bill)
+        return bills
+
+    def search_fec(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        match = _fts_match(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT f.payload FROM fec_fts JOIN fec_records f ON f.rowid = fec_fts.rowid
+                WHERE fec_fts MATCH ?
+                ORDER BY bm25(fec_fts, 5.0, 1.0), f.last_file_date DESC
+                LIMIT ?
+            """, (match, limit)).fetchall()
+        return [json.loads(row['payload']) for row in rows]
+
+
+def _initial_watermark() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=Config.GOV_MIRROR_INITIAL_DAYS)
+
+
+def _parse_date(value: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def sync_congress_bills(mirror: GovernmentMirror, client) -> int:
+    """Pull bills updated since the last sync, oldest update first, committing page by page"""
+    if not Config.CONGRESS_API_KEY:
+        return 0
+    since = _parse_date(mirror.watermark('congress_bills') or '') or _initial_watermark()
+    params = {
+        'api_key': Config.CONGRESS_API_KEY,
+        'format': 'json',
+        'limit': 250,
+        'sort': 'updateDate asc',
+        'fromDateTime': since.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+    synced = 0
+    caught_up = False
+    for page in range(Config.GOV_MIRROR_MAX_PAGES):
+        params['offset'] = page * params['limit']
+        response = await client.get(CONGRESS_BILLS_URL, params=params)
+        response.raise_for_status()
+        bills = response.json().get('bills', [])
+        if not bills:
+            caught_up = True
+            break
+        newest = max((_parse_date(bill.get('updateDate', '')) for bill in bills if bill.get('updateDate')),
+                     default=None) or since
+        since = max(since, newest)
+        mirror.upsert_bills(bills)
+        # Oldest first, so committing the watermark with each page makes an interrupted sync resumable
+        mirror.save_progress('congress_bills', since.strftime('%Y-%m-%dT%H:%M:%SZ'), len(bills))
+        synced += len(bills)
+        if len(bills) < params['limit']:
+            caught_up = True
+            break
+    if caught_up:
+        # Only now is the mirror complete enough to answer from instead of the live API
+        mirror.save_progress('congress_bills', since.strftime('%Y-%m-%dT%H:%M:%SZ'), 0, complete=True)
+    return synced
+
+
+async def sync_fec(mirror: GovernmentMirror, client, kind: str) -> int:
+    """Pull candidates or committees that filed since the last sync, newest filing first"""
+    if not Config.FEC_API_KEY:
+        return 0
+    resource = f'fec_{kind}s'
+    state = mirror.state(resource) or {}
+    watermark = state.get('watermark') or _initial_watermark().strftime('%Y-%m-%d')
+    # A previous pass that hit the page cap continues from its next page
+    first_page = state.get('resume_page') or 1
+    newest = state.get('pending_watermark') or watermark
+    synced = 0
+    finished = False
+    for page in range(first_page, first_page + Config.GOV_MIRROR_MAX_PAGES):
+        params = {
+            'api_key': Config.FEC_API_KEY,
+            'sort': '-last_file_date',
+            'per_page': 100,
+            'page': page,
+        }
+        response = await client.get(f"{FEC_BASE_URL}{kind}s/", params=params)
+        response.raise_for_status()
+        results = response.json().get('results', [])
+        # Sorted newest first, so stop at the first record we've already seen
+        changed = [r for r in results if (r.get('last_file_date') or '') >= watermark]
+        if changed:
+            newest = max(newest, max(r.get('last_file_date') or '' for r in changed))
+            synced += mirror.upsert_fec(kind, changed)
+        if len(changed) < len(results) or len(results) < params['per_page']:
+            finished = True
+            break
+    if finished:
+        # The whole change window is in: only now advance the watermark
+        mirror.save_progress(resource, newest, synced, complete=True)
+    else:
+        # Stopped by the page cap with older changes still unfetched: keep the watermark, resume next time
+        mirror.save_progress(resource, watermark, synced, resume_page=page + 1, pending_watermark=newest)
+    return synced
+
+
+async def sync_all(mirror: GovernmentMirror, congress: bool = True, fec: bool = True) -> Dict[str, int]:
+    import httpx
+    results = {}
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        jobs = {}
+        if congress:
+            jobs['congress_bills'] = sync_congress_bills(mirror, client)
+        if fec:
+            jobs['fec_candidates'] = sync_fec(mirror, client, 'candidate')
+            jobs['fec_committees'] = sync_fec(mirror, client, 'committee')
+        outcomes = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        for name, outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Error syncing {name}: {outcome}")
+                results[name] = 0
+            else:
+                results[name] = outcome
+    return results
+
+
+_mirror: Optional[GovernmentMirror] = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror() -> GovernmentMirror:
+    """Shared mirror instance, opened on first use"""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = GovernmentMirror()
+    return _mirror
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror Congress.gov bills and FEC records locally")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sync = sub.add_parser('sync', help="Pull changes since the last sync")
+    sync.add_argument('--only', choices=['congress', 'fec'], help="Sync just one source")
+    sub.add_parser('status', help="Show record counts and sync watermarks")
+    args = parser.parse_args()
+
+    mirror = get_mirror()
+    if args.command == 'sync':
+        results = asyncio.run(sync_all(mirror, congress=args.only != 'fec', fec=args.only != 'congress'))
+        print(json.dumps(results, indent=2))
+    print(json.dumps(mirror.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from settings import Config
+
+
+class ModelHealth:
+    """Rolling latency and error state for one model in one stage (prompt sizes differ per stage)"""
+
+    def __init__(self):
+        self.ewma_latency_ms: Optional[float] = None
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+
+    def record_success(self, latency_ms: float):
+        alpha = Config.ROUTER_EWMA_ALPHA
+        if self.ewma_latency_ms is None:
+            self.ewma_latency_ms = latency_ms
+        else:
+            self.ewma_latency_ms = alpha * latency_ms + (1 - alpha) * self.ewma_latency_ms
+        self.consecutive_errors = 0
+
+    def record_failure(self):
+        self.consecutive_errors += 1
+        if self.consecutive_errors >= Config.ROUTER_ERROR_THRESHOLD:
+            self.cooldown_until = time.time() + Config.ROUTER_COOLDOWN_SECONDS
+
+    @property
+    def available(self) -> bool:
+        return time.time() >= self.cooldown_until
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0) -> float:
+    """USD cost of one call from Config.MODEL_PRICING (per million tokens), with cached input discounted"""
+    input_price, output_price = Config.MODEL_PRICING.get(model, (0.0, 0.0))
+    input_cost = (input_tokens - cached_input_tokens + cached_input_tokens * Config.CACHED_INPUT_PRICE_RATIO) * input_price
+    return (input_cost + output_tokens * output_price) / 1_000_000
+
+
+class ModelRouter:
+    """Picks a model per pipeline stage and falls back down the stage's chain on slowness or errors"""
+
+    def __init__(self, stage_models: Dict[str, List[str]] = None, llm_factory: Callable[[str], Any] = None):
+        self.stage_models = stage_models or Config.STAGE_MODELS
+        self._llm_factory = llm_factory or self._build_llm
+        # event loop -> model -> client. A client's connection pool belongs to the loop that opened it,
+        # so each loop gets its own; clients of closed loops are dropped.
+        self._llms: Dict[asyncio.AbstractEventLoop, Dict[str, Any]] = {}
+        # (stage, model) -> health
+        self.health: Dict[tuple, ModelHealth] = {}
+        # stage -> model -> counters
+        self.telemetry: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_llm(model: str):
+        from langchain_openai import ChatOpenAI
+        api_key = Config.OPENAI_API_KEY if Config.OPENAI_API_KEY else None
+        return ChatOpenAI(model=model, temperature=0.1, api_key=api_key)
+
+    def llm(self, model: str):
+        """The client for `model` on the running event loop (a fresh, uncached one outside any loop)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._llm_factory(model)
+        with self._lock:
+            if loop not in self._llms:
+                for closed in [other for other in self._llms if other.is_closed()]:
+                    del self._llms[closed]
+            llms = self._llms.setdefault(loop, {})
+            if model not in llms:
+                llms[model] = self._llm_factory(model)
+            return llms[model]
+
+    def _health(self, stage: str, model: str) -> ModelHealth:
+        key = (stage, model)
+        if key not in self.health:
+            self.health[key] = ModelHealth()
+        return self.health[key]
+
+    def candidates(self, stage: str) -> List[str]:
+        """
+        Models to try for a stage, best first
+        Cooling-down models are skipped; models running over the stage's latency budget are tried
+        last; with ROUTER_STRATEGY 'cost' the remaining models are ordered cheapest first.
+        """
+        chain = self.stage_models.get(stage) or [Config.OPENAI_MODEL]
+        available = [model for model in chain if self._health(stage, model).available] or list(chain)
+        budget = Config.STAGE_LATENCY_BUDGETS_MS.get(stage)
+        def over_budget(model):
+            latency = self._health(stage, model).ewma_latency_ms
+            return budget is not None and latency is not None and latency > budget
+        ranked = sorted(available, key=lambda model: (
+            over_budget(model),
+            sum(Config.MODEL_PRICING.get(model, (0.0, 0.0))) if Config.ROUTER_STRATEGY == 'cost' else 0,
+            chain.index(model),
+        ))
+        return ranked
+
+    async def ainvoke(self, stage: str, messages: List[Any], usage: Optional[List[Dict]] = None, prompt=None):
+        """
+        Run one stage's call, falling back to the next candidate on timeout or error
+        Returns: the model's message; per-call telemetry is appended to `usage` if given,
+        with prompt and cacheable-prefix token counts when `prompt` (a prompts.RenderedPrompt) is
+        """
+        timeout = Config.STAGE_TIMEOUTS.get(stage)
+        last_error: Optional[BaseException] = None
+        for attempt, model in enumerate(self.candidates(stage)):
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self.llm(model).agenerate([messages]), timeout=timeout)
+            except Exception as e:
+                latency_ms = (time.perf_counter() - start) * 1000
+                self._health(stage, model).record_failure()
+                self._record(stage, model, latency_ms, 0, 0, error=e)
+                print(f"[router] {stage} on {model} failed after {latency_ms:.0f} ms: {e!r}; falling back")
+                last_error = e
+                continue
+            latency_ms = (time.perf_counter() - start) * 1000
+            token_usage = (result.llm_output or {}).get('token_usage') or {}
+            input_tokens = token_usage.get('prompt_tokens', 0)
+            output_tokens = token_usage.get('completion_tokens', 0)
+            # Input tokens the provider served from its prompt cache, when it reports them
+            cached_input_tokens = (token_usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0
+            # Tokenizing (and loading the tokenizer the first time) runs off the shared event loop
+            prompt_stats = await asyncio.to_thread(prompt.stats, model) if prompt is not None else {}
+            self._health(stage, model).record_success(latency_ms)
+            cost = self._record(stage, model, latency_ms, input_tokens, output_tokens, fallback=attempt > 0,
+                                cached_input_tokens=cached_input_tokens,
+                                cache_eligible_tokens=prompt_stats.get('cache_eligible_tokens', 0))
+            if usage is not None:
+                usage.append({
+                    'stage': stage,
+                    'model': model,
+                    'latency_ms': round(latency_ms, 1),
+                    'input_tokens': input_tokens,
+                    'cached_input_tokens': cached_input_tokens,
+                    'output_tokens': output_tokens,
+                    'cost_usd': round(cost, 6),
+                    'fallback': attempt > 0,
+                    **prompt_stats,
+                })
+            return result.generations[0][0].message
+        raise last_error or RuntimeError(f"No model configured for stage {stage}")
+
+    def _record(self, stage: str, model: str, latency_ms: float, input_tokens: int, output_tokens: int,
+                error: Optional[BaseException] = None, fallback: bool = False,
+                cached_input_tokens: int = 0, cache_eligible_tokens: int = 0) -> float:
+        cost = estimate_cost(model, input_tokens, output_tokens, cached_input_tokens)
+        with self._lock:
+            counters = self.telemetry.setdefault(stage, {}).setdefault(model, {
+                'calls': 0, 'errors': 0, 'timeouts': 0, 'fallback_successes': 0,
+                'latency_ms_total': 0.0, 'input_tokens': 0, 'cached_input_tokens': 0, 'cache_eligible_tokens': 0,
+                'output_tokens': 0, 'cost_usd': 0.0,
+            })
+            counters['calls'] += 1
+            counters['latency_ms_total'] += latency_ms
+            if error is not None:
+                counters['errors'] += 1
+                if isinstance(error, asyncio.TimeoutError):
+                    counters['timeouts'] += 1
+            else:
+                counters['input_tokens'] += input_tokens
+                counters['cached_input_tokens'] += cached_input_tokens
+                counters['cache_eligible_tokens'] += cache_eligible_tokens
+                counters['output_tokens'] += output_tokens
+                counters['cost_usd'] += cost
+                if fallback:
+                    counters['fallback_successes'] += 1
+        return cost
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-stage, per-model cost and latency totals plus current health"""
+        with self._lock:
+            stages = {}
+            for stage, models in self.telemetry.items():
+                stages[stage] = {}
+                for model, counters in models.items():
+                    entry = dict(counters)
+                    entry['avg_latency_ms'] = round(counters['latency_ms_total'] / counters['calls'], 1)
+                    entry['cost_usd'] = round(counters['cost_usd'], 6)
+                    stages[stage][model] = entry
+        return {
+            'stages': stages,
+            'health': {f"{stage}/{model}": {
+                'ewma_latency_ms': round(health.ewma_latency_ms, 1) if health.ewma_latency_ms is not None else None,
+                'consecutive_errors': health.consecutive_errors,
+                'available': health.available,
+            } for (stage, model), health in self.health.items()},
+        }
@@ -1,5 +1,3 @@
-import requests
-import httpx
 import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
@@ -7,9 +5,13 @@ import time
 from tenacity import retry, stop_after_attempt, wait_exponential
 from settings import Config
 import json
-from bs4 import BeautifulSoup
+
+# httpx, requests and bs4 are imported where they're used so that importing this
+# module (and the app) stays cheap until the first retrieval actually runs.
 
 def fetch_first_paragraph(url):
+    import requests
+    from bs4 import BeautifulSoup
     try:
         resp = requests.get(url, timeout=5)
         soup = BeautifulSoup(resp.text, 'html.parser')
@@ -49,6 +51,7 @@ class NewsAPIClient:
             'from': (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
         }
         
+        import httpx
         async with httpx.AsyncClient() as client:
             response = await client.get(f"{self.base_url}/everything", params=params)
             if response.status_code == 200:
@@ -73,6 +76,7 @@ class GuardianAPIClient:
             'show-fields': 'headline,trailText,byline,webPublicationDate,bodyText',
             'page-size': 20
         }
+        import httpx
         async with httpx.AsyncClient() as client:
             response = await client.get(self.base_url, params=params)
             if response.status_code == 200:
@@ -103,6 +107,7 @@ class SerperSearchClient:
             'hl': 'en'
         }
         
+        import httpx
         async with httpx.AsyncClient() as client:
             response = await client.post(self.base_url, headers=headers, json=payload)
             if response.status_code == 200:
@@ -130,6 +135,7 @@ class BraveSearchClient:
             'country': 'us',
             'freshness': 'Day'
         }
+        import httpx
         async with httpx.AsyncClient() as client:
             response = await client.get(self.base_url, headers=headers, params=params)
             if response.status_code == 200:
@@ -137,14 +143,24 @@ class BraveSearchClient:
                 return data.get('web', {}).get('results', [])
             return []
 
+def _government_mirror():
+    if not Config.GOV_MIRROR_ENABLED:
+        return None
+    from gov_mirror import get_mirror
+    return get_mirror()
+
 class GovernmentAPIClient:
     def __init__(self):
         self.congress_api_key = Config.CONGRESS_API_KEY
         self.fec_api_key = Config.FEC_API_KEY
+        self.mirror = _government_mirror()
         
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def get_congress_data(self, query: str) -> List[Dict]:
-        """Get data from Congress.gov API"""
+        """Get bills from the local mirror once synced, else live from the Congress.gov API"""
+        # SQLite reads run off the shared event loop, which every request's coroutines run on
+        if self.mirror and await asyncio.to_thread(self.mirror.has_synced, 'congress_bills'):
+            return await asyncio.to_thread(self.mirror.search_bills, query)
         if not self.congress_api_key:
             return []
             
@@ -154,6 +170,7 @@ class GovernmentAPIClient:
             'format': 'json'
         }
         
+        import httpx
         async with httpx.AsyncClient() as client:
             response = await client.get("https://api.congress.gov/v3/bills", params=params)
             if response.status_code == 200:
@@ -165,8 +182,16 @@ class FECAPIClient:
     def __init__(self):
         self.api_key = Config.FEC_API_KEY
         self.base_url = "https://api.open.fec.gov/v1/"
+        self.mirror = _government_mirror()
+
+    def _mirror_synced(self) -> bool:
+        return self.mirror.has_synced('fec_candidates') or self.mirror.has_synced('fec_committees')
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def get_fec_data(self, query: str) -> List[Dict]:
+        """Get candidates/committees from the local mirror once synced, else live from the FEC API"""
+        if self.mirror and await asyncio.to_thread(self._mirror_synced):
+            return await asyncio.to_thread(self.mirror.search_fec, query)
         if not self.api_key:
             return []
         params = {
@@ -174,6 +199,7 @@ class FECAPIClient:
             'q': query,
             'per_page': 10
         }
+        import httpx
         async with httpx.AsyncClient() as client:
             response = await client.get(f"{self.base_url}search/", params=params)
             if response.status_code == 200:
@@ -182,31 +208,13 @@ class FECAPIClient:
             return []
 
 class WebScraper:
-    """Fallback web scraper for political news sources"""
-    
+    """Recent headlines from the political outlets' feeds, once the app has started feed_ingest polling"""
+
     @staticmethod
     async def scrape_political_news(query: str) -> List[Dict]:
-        """Scrape political news from trusted sources"""
-        # This is a simplified version - in production you'd want more robust scraping
-        sources = Config.POLITICAL_NEWS_SOURCES[:3]  # Limit to top 3 sources
-        results = []
-        
-        for source in sources:
-            try:
-                # Simple search simulation - in production use proper scraping
-                result = {
-                    'title': f"Political news about {query}",
-                    'url': f"https://{source}/search?q={query}",
-                    'source': source,
-                    'description': f"Latest political information about {query}",
-                    'publishedAt': datetime.now().isoformat()
-                }
-                results.append(result)
-            except Exception as e:
-                print(f"Error scraping {source}: {e}")
-                continue
-                
-        return results
+        """Match the query against feed items already in memory (no network I/O per query)"""
+        from feed_ingest import recent_items
+        return recent_items.search(query)
 
 class DataAggregator:
     """Aggregates data from multiple sources asynchronously"""
@@ -218,24 +226,36 @@ class DataAggregator:
         self.gov_client = GovernmentAPIClient()
         self.fec_client = FECAPIClient()  # Add FEC client if not present
         self.scraper = WebScraper()
+        self.article_index = None
+        if Config.ARTICLE_INDEX_ENABLED:
+            from article_index import ArticleIndex
+            self.article_index = ArticleIndex()
     async def get_comprehensive_political_data(self, query: str) -> Dict[str, Any]:
+        # Recurring subjects are answered from the local index; upstream only when it's thin or stale
+        # The index is SQLite: query it off the event loop, which every request shares
+        local = await asyncio.to_thread(self.article_index.lookup, query) if self.article_index else None
         tasks = [
-            self.news_client.get_political_news(query),
-            self.guardian_client.get_political_news(query),
-            self.search_client.search_political_info(query),
-            self.brave_client.search_political_info(query),
             self.gov_client.get_congress_data(query),
             self.fec_client.get_fec_data(query),
             self.scraper.scrape_political_news(query)
         ]
+        if local is None:
+            tasks += [
+                self.news_client.get_political_news(query),
+                self.guardian_client.get_political_news(query),
+                self.search_client.search_political_info(query),
+                self.brave_client.search_political_info(query)
+            ]
         results = await asyncio.gather(*tasks, return_exceptions=True)
-        news_articles = results[0] if not isinstance(results[0], Exception) else []
-        guardian_articles = results[1] if not isinstance(results[1], Exception) else []
-        search_results = results[2] if not isinstance(results[2], Exception) else []
-        brave_results = results[3] if not isinstance(results[3], Exception) else []
-        government_data = results[4] if not isinstance(results[4], Exception) else []
-        fec_data = results[5] if not isinstance(results[5], Exception) else []
-        scraped_data = results[6] if not isinstance(results[6], Exception) else []
+        results = [result if not isinstance(result, Exception) else [] for result in results]
+        government_data, fec_data, scraped_data = results[:3]
+        if local is None:
+            news_articles, guardian_articles, search_results, brave_results = results[3:]
+        else:
+            news_articles = local['news_articles']
+            guardian_articles = local['guardian_articles']
+            search_results = local['search_results']
+            brave_results = local['brave_results']
 
         data = {
             'news_articles': news_articles,
@@ -244,7 +264,14 @@ class DataAggregator:
             'brave_results': brave_results,
             'government_data': government_data,
             'fec_data': fec_data,
+            'feed_items': scraped_data,
+            'from_local_index': local is not None,
         }
+        if local is None and self.article_index:
+            try:
+                await asyncio.to_thread(self.article_index.ingest, data)
+            except Exception as e:
+                print(f"Error indexing articles: {e}")
         # Ensure search_results and brave_results are lists, not exceptions
         search_results = search_results if isinstance(search_results, list) else []
         brave_results = brave_results if isinstance(brave_results, list) else []
@@ -253,7 +280,7 @@ class DataAggregator:
         for result in search_results + brave_results:
             link = result.get('link') or result.get('url')
             if link and ("wikipedia.org" in link or "whitehouse.gov" in link):
-                summary = fetch_first_paragraph(link)
+                summary = await asyncio.to_thread(fetch_first_paragraph, link)
                 if summary:
                     scraped_summaries.append({'url': link, 'summary': summary})
         data['scraped_summaries'] = scraped_summaries
@@ -1,41 +1,98 @@
-from typing import Dict, List, Any, Optional
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 import asyncio
+import contextlib
 from datetime import datetime
 import re
 
 from settings import Config
-from news_sources import DataAggregator
+from model_router import ModelRouter
+import prompts
+from conversation_stats import ConversationStats
+
+# Retrieval result keys reported per answer for source-usage analytics
+SOURCE_TYPES = [
+    'news_articles', 'guardian_articles', 'search_results', 'brave_results',
+    'government_data', 'fec_data', 'feed_items', 'scraped_summaries'
+]
+
+# (key, heading, instruction) for each section generated in parallel answer mode, in answer order
+PERSPECTIVES = [
+    ('republican', 'Republican Perspective',
+     "Describe the Republican perspective on the question, as Republicans themselves would put it."),
+    ('democratic', 'Democratic Perspective',
+     "Describe the Democratic perspective on the question, as Democrats themselves would put it."),
+    ('neutral', 'Neutral Analysis',
+     "Give a neutral analysis: the key facts, what is agreed and what is disputed."),
+]
+FAILED_SECTION_TEXT = "This perspective could not be generated."
+# Compiled once at import; each keeps a byte-stable prefix across calls
+PERSPECTIVE_PROMPTS = {key: prompts.perspective(instruction) for key, _, instruction in PERSPECTIVES}
 
 class PoliticsChatbotAgentic:
     """Agentic chatbot class for political queries with advanced reasoning and neutrality"""
     def __init__(self):
-        api_key = Config.OPENAI_API_KEY if Config.OPENAI_API_KEY else None
-        self.llm = ChatOpenAI(
-            model=Config.OPENAI_MODEL,
-            temperature=0.1,
-            api_key=api_key
-        )
-        self.data_aggregator = DataAggregator()
+        # langchain/openai and the API clients are slow to import, so both are built on first use
+        self.router = ModelRouter()
+        self._data_aggregator = None
+
+    @property
+    def data_aggregator(self):
+        if self._data_aggregator is None:
+            from news_sources import DataAggregator
+            self._data_aggregator = DataAggregator()
+        return self._data_aggregator
+
+    @data_aggregator.setter
+    def data_aggregator(self, value):
+        self._data_aggregator = value
+
+    async def warm_up(self):
+        """
+        Import langchain and build the LLM and API clients ahead of the first chat
+        Run on the event loop chats run on: the router caches LLM clients per loop.
+        """
+        try:
+            await asyncio.to_thread(self._warm_up_imports)
+            for models in self.router.stage_models.values():
+                self.router.llm(models[0])
+        except Exception as e:
+            print(f"Warm-up failed, will retry on first chat: {e}")
+
+    def _warm_up_imports(self):
+        from langchain.schema import HumanMessage
+        from langchain_openai import ChatOpenAI
+        for models in self.router.stage_models.values():
+            # Loads the tokenizer used for prompt token reporting
+            prompts.count_tokens('', models[0])
+        self.data_aggregator
 
     async def chat(self, message: str, conversation_history: Optional[List[Dict]] = None) -> Dict[str, Any]:
+        result = None
+        async for event in self.chat_stream(message, conversation_history):
+            if event['type'] == 'result':
+                result = event['result']
+        return result
+
+    async def chat_stream(self, message: str, conversation_history: Optional[List[Dict]] = None,
+                          parallel: Optional[bool] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer a message, yielding progress as it happens
+        Yields: {'type': 'section', 'key', 'title', 'text'} as each perspective is ready (parallel mode
+        only), then a final {'type': 'result', 'result': {...}} with the same result chat() returns
+        """
         if conversation_history is None:
             conversation_history = []
+        if parallel is None:
+            parallel = Config.ANSWER_MODE == 'parallel'
         try:
+            # Per-stage model, latency, token and cost records for this turn
+            model_usage = []
+            # Perspectives whose call failed (parallel mode)
+            failed_sections = []
             # 1. LLM-based query classification (strict YES/NO)
-            classification_prompt = f"""
-            SYSTEM: You are an expert political assistant. Is the following user question about politics, government, public policy, or a public controversy involving a political figure? If the question could plausibly relate to politics, answer YES. Otherwise, answer NO.
-            
-            Examples:
-            Q: Why did he feud with Elon Musk?\nA: YES
-            Q: What are Taylor Swift's political views?\nA: YES
-            Q: Who won the NBA finals?\nA: NO
-            Q: What is the US immigration policy?\nA: YES
-            Q: Tell me about the latest Marvel movie.\nA: NO
-            USER: {message}
-            """
-            classification = self.llm.invoke([HumanMessage(content=classification_prompt)])
+            classification_prompt = prompts.CLASSIFY.render(message=message)
+            classification = await self.router.ainvoke('classify', classification_prompt.messages(), model_usage,
+                                                       prompt=classification_prompt)
             classification_text = str(classification.content) if hasattr(classification, 'content') else str(classification)
             is_political = classification_text.strip().lower().startswith("yes")
             if not is_political:
@@ -43,49 +100,47 @@ class PoliticsChatbotAgentic:
                     "I'm sorry, but I can only answer questions about politics, government, or public policy. "
                     "If you have a political question, please ask!"
                 )
-                return {
+                yield {'type': 'result', 'result': {
                     "response": refusal_message,
                     "is_political": False,
                     "confidence_score": 0,
                     "bias_analysis": {},
                     "citation_analysis": {},
                     "sources": "",
+                    "model_usage": model_usage,
                     "timestamp": datetime.now().isoformat()
-                }
+                }}
+                return
             # 2. Retrieve up-to-date context from all APIs
             data = await self.data_aggregator.get_comprehensive_political_data(message)
             context = self._create_context_from_data(data)
             print("[DEBUG] Context for LLM prompt:\n", context)  # Debug print
             # 3. Build advanced prompt for neutrality, multi-perspective analysis, and self-reflection
             # Add last 4 turns of conversation history for context
-            history_str = ""
-            for turn in conversation_history[-4:]:
-                user_msg = turn.get('message', '')
-                assistant_msg = turn.get('response', '')
-                history_str += f"USER: {user_msg}\n"
-                history_str += f"ASSISTANT: {assistant_msg}\n"
-            prompt = f"""
-            SYSTEM: You are a political information assistant. You MUST use ONLY the CONTEXT below to answer the user's question.
-            - Present both Republican and Democratic perspectives on the issue, if relevant.
-            - Maintain a neutral, factual tone and do not express personal opinions.
-            - Do not guess or use your own knowledge; only use the CONTEXT.
-            - Do not include a 'Sources' section in your answer; sources will be appended automatically.
-            - Do not answer any non-political questions, if you think a question has some political context then only answer.
-
-            CONTEXT:
-            {context}
-            {history_str}
-            USER: {message}
-            """
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            response_content = str(response.content) if hasattr(response, 'content') else str(response)
+            history_str = prompts.format_history(conversation_history[-4:])
+            if parallel:
+                # One shorter generation per perspective, run concurrently, instead of one long one
+                sections = {}
+                # Closed as soon as this generator is, so an abandoned stream cancels the calls right away
+                async with contextlib.aclosing(self._generate_perspectives(context, history_str, message,
+                                                                           model_usage)) as perspectives:
+                    async for key, title, text in perspectives:
+                        if text is None:
+                            failed_sections.append(key)
+                            text = FAILED_SECTION_TEXT
+                        sections[key] = text
+                        yield {'type': 'section', 'key': key, 'title': title, 'text': text,
+                               'error': key in failed_sections}
+                if len(failed_sections) == len(PERSPECTIVES):
+                    raise RuntimeError("no perspective could be generated")
+                response_content = self._merge_perspectives(sections)
+            else:
+                prompt = prompts.ANSWER.render(context=context, history=history_str, message=message)
+                response = await self.router.ainvoke('answer', prompt.messages(), model_usage, prompt=prompt)
+                response_content = str(response.content) if hasattr(response, 'content') else str(response)
             # 4. Self-reflection for bias/neutrality
-            critique_prompt = (
-                "Review your previous answer for bias or lack of neutrality. "
-                "If any, revise to be more balanced. Otherwise, reply: 'No revision needed.'\n"
-                f"Answer:\n{response_content}"
-            )
-            critique = self.llm.invoke([HumanMessage(content=critique_prompt)])
+            critique_prompt = prompts.CRITIQUE.render(answer=response_content)
+            critique = await self.router.ainvoke('critique', critique_prompt.messages(), model_usage, prompt=critique_prompt)
             critique_content = str(critique.content) if hasattr(critique, 'content') else str(critique)
 
             if critique_content.strip().lower().startswith("no revision needed"):
@@ -103,32 +158,67 @@ class PoliticsChatbotAgentic:
             sources_section = self._extract_sources(data, llm_answer)
             final_answer = f"{llm_answer}\n\nSources:\n{sources_section}"
             confidence_score = self.data_aggregator.calculate_confidence_score(data)
-            return {
+            yield {'type': 'result', 'result': {
                 "response": final_answer,
                 "is_political": True,
                 "confidence_score": confidence_score,
                 "bias_analysis": critique_content,
                 "citation_analysis": {},
                 "sources": sources_section,
+                "source_types": [key for key in SOURCE_TYPES if data.get(key)],
+                # Sections replaced by FAILED_SECTION_TEXT; a partial answer is not cached
+                **({"partial": True, "failed_sections": failed_sections} if failed_sections else {}),
+                "model_usage": model_usage,
                 "timestamp": datetime.now().isoformat()
-            }
+            }}
         except Exception as e:
-            return {
+            yield {'type': 'result', 'result': {
                 "response": f"I apologize, but I encountered an error processing your request: {str(e)}",
                 "error": True,
                 "timestamp": datetime.now().isoformat()
-            }
+            }}
+
+    async def _generate_perspectives(self, context: str, history_str: str, message: str,
+                                     model_usage: List[Dict]) -> AsyncIterator[Tuple[str, str, str]]:
+        """
+        Run one 'perspective' call per PERSPECTIVES entry concurrently, yielding (key, title, text) as each
+        finishes; text is None for a section whose call failed
+        """
+        async def generate(key, title):
+            prompt = PERSPECTIVE_PROMPTS[key].render(context=context, history=history_str, message=message)
+            try:
+                response = await self.router.ainvoke('perspective', prompt.messages(), model_usage, prompt=prompt)
+                text = str(response.content) if hasattr(response, 'content') else str(response)
+            except Exception as e:
+                # One failed section shouldn't sink the other two
+                print(f"Error generating {key} perspective: {e}")
+                return key, title, None
+            # Drop a heading the model added anyway, so it isn't repeated under ours
+            text = re.sub(rf"^\s*(#+\s*|\*\*)?{re.escape(title)}(\*\*)?:?\s*\n+", "", text, flags=re.IGNORECASE)
+            return key, title, text.strip()
+
+        tasks = [asyncio.ensure_future(generate(key, title)) for key, title, _ in PERSPECTIVES]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer stopped early (e.g. the client disconnected): don't leave calls running
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _merge_perspectives(sections: Dict[str, str]) -> str:
+        """Assemble the sections in a fixed order under their own headings"""
+        parts = []
+        for key, title, _ in PERSPECTIVES:
+            text = sections.get(key)
+            if text:
+                parts.append(f"**{title}**\n{text}")
+        return "\n\n".join(parts)
 
     def get_conversation_summary(self, conversation_history: List[Dict]) -> Dict[str, Any]:
         """Generate a summary of the conversation statistics"""
-        political_queries = sum(1 for msg in conversation_history if msg.get("is_political", False))
-        total_queries = len(conversation_history)
-        return {
-            "total_queries": total_queries,
-            "political_queries": political_queries,
-            "non_political_queries": total_queries - political_queries,
-            "political_percentage": (political_queries / total_queries * 100) if total_queries > 0 else 0
-        }
+        return ConversationStats.from_turns(conversation_history).summary()
     def _create_context_from_data(self, data: Dict[str, Any]) -> str:
         context_parts = []
         if data.get('news_articles'):
@@ -157,6 +247,10 @@ class PoliticsChatbotAgentic:
                 desc = result.get('description', '')
                 url = result.get('url', 'No url')
                 context_parts.append(f"- {title}: {desc} ({url})")
+        if data.get('feed_items'):
+            context_parts.append("\nRecent Headlines:")
+            for item in data['feed_items'][:3]:
+                context_parts.append(f"- {item['title']}: {item['description']} ({item['url']})")
         if data.get('government_data'):
             context_parts.append("\nGovernment Data:")
             for item in data['government_data'][:1]:
@@ -185,6 +279,10 @@ class PoliticsChatbotAgentic:
             url = result.get('url')
             if url:
                 all_urls.add(url)
+        for item in data.get('feed_items', []):
+            url = item.get('url')
+            if url:
+                all_urls.add(url)
         for item in data.get('scraped_summaries', []):
             url = item.get('url')
             if url:
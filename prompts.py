@@ -0,0 +1,169 @@
+import string
+import textwrap
+import time
+from typing import Any, Dict, List
+
+from settings import Config
+
+
+# model -> tokenizer; failures are remembered (model -> time) only long enough to avoid retrying on every call
+_encodings: Dict[str, Any] = {}
+_encoding_failures: Dict[str, float] = {}
+
+
+def _encoding(model: str):
+    """The model's tokenizer, or None if tiktoken is missing or can't load it (e.g. offline) right now"""
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    failed_at = _encoding_failures.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < Config.PROMPT_TOKENIZER_RETRY_SECONDS:
+        return None
+    try:
+        # Imported on first count rather than at startup
+        import tiktoken
+    except ImportError:
+        _encoding_failures[model] = float('inf')
+        return None
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Models newer than the installed tiktoken
+            encoding = tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        print(f"Tokenizer for {model} unavailable, estimating prompt tokens: {e}")
+        _encoding_failures[model] = time.monotonic()
+        return None
+    _encodings[model] = encoding
+    _encoding_failures.pop(model, None)
+    return encoding
+
+
+def count_tokens(text: str, model: str = Config.OPENAI_MODEL) -> int:
+    """Tokens in `text` for `model`, or roughly len/4 without a tokenizer"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def cache_eligible_tokens(prefix_tokens: int) -> int:
+    """How much of a static prefix the provider can serve from its prompt cache"""
+    if prefix_tokens < Config.PROMPT_CACHE_MIN_TOKENS:
+        return 0
+    # Cached in fixed increments above the minimum
+    extra = prefix_tokens - Config.PROMPT_CACHE_MIN_TOKENS
+    return Config.PROMPT_CACHE_MIN_TOKENS + extra - extra % Config.PROMPT_CACHE_INCREMENT
+
+
+class RenderedPrompt:
+    """One filled-in prompt: the shared static prefix as the system message, the variable part after it"""
+
+    def __init__(self, template: 'PromptTemplate', variable: str):
+        self.template = template
+        self.prefix = template.prefix
+        self.variable = variable
+
+    @property
+    def text(self) -> str:
+        return f"{self.prefix}\n\n{self.variable}"
+
+    def messages(self) -> List[Any]:
+        from langchain.schema import HumanMessage, SystemMessage
+        return [SystemMessage(content=self.prefix), HumanMessage(content=self.variable)]
+
+    def stats(self, model: str = Config.OPENAI_MODEL) -> Dict[str, int]:
+        prefix_tokens = self.template.prefix_tokens(model)
+        return {
+            'prompt_tokens': prefix_tokens + count_tokens(self.variable, model),
+            'prefix_tokens': prefix_tokens,
+            'cache_eligible_tokens': cache_eligible_tokens(prefix_tokens),
+        }
+
+
+class PromptTemplate:
+    """
+    A prompt compiled once into a byte-stable static prefix and a variable suffix
+    The prefix (rules, few-shot examples) is identical on every call, so providers can cache it;
+    everything that changes per request goes in the suffix, after it.
+    """
+
+    def __init__(self, name: str, prefix: str, suffix: str):
+        self.name = name
+        self.prefix = textwrap.dedent(prefix).strip()
+        # Pre-split into (literal, field) pieces so rendering is a join, not a format-string parse
+        self._pieces = [(literal, field) for literal, field, _, _ in string.Formatter().parse(textwrap.dedent(suffix).strip())]
+        self.fields = {field for _, field in self._pieces if field}
+        self._prefix_tokens: Dict[str, int] = {}
+
+    def render(self, **variables: Any) -> RenderedPrompt:
+        missing = self.fields - variables.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.name} is missing {', '.join(sorted(missing))}")
+        variable = ''.join(literal + (str(variables[field]) if field else '') for literal, field in self._pieces)
+        return RenderedPrompt(self, variable)
+
+    def prefix_tokens(self, model: str = Config.OPENAI_MODEL) -> int:
+        if model not in self._prefix_tokens:
+            self._prefix_tokens[model] = count_tokens(self.prefix, model)
+        return self._prefix_tokens[model]
+
+
+ANSWER_RULES = """
+You are a political information assistant. You MUST use ONLY the CONTEXT in the user message to answer the user's question.
+- Maintain a neutral, factual tone and do not express personal opinions.
+- Do not guess or use your own knowledge; only use the CONTEXT.
+- Do not include a 'Sources' section in your answer; sources will be appended automatically.
+"""
+
+CONTEXT_SUFFIX = """
+CONTEXT:
+{context}
+
+{history}USER: {message}
+"""
+
+CLASSIFY = PromptTemplate('classify', """
+You are an expert political assistant. Is the following user question about politics, government, public policy, or a public controversy involving a political figure? If the question could plausibly relate to politics, answer YES. Otherwise, answer NO.
+
+Examples:
+Q: Why did he feud with Elon Musk?
+A: YES
+Q: What are Taylor Swift's political views?
+A: YES
+Q: Who won the NBA finals?
+A: NO
+Q: What is the US immigration policy?
+A: YES
+Q: Tell me about the latest Marvel movie.
+A: NO
+""", """
+USER: {message}
+""")
+
+ANSWER = PromptTemplate('answer', ANSWER_RULES + """- Present both Republican and Democratic perspectives on the issue, if relevant.
+- Do not answer any non-political questions, if you think a question has some political context then only answer.
+""", CONTEXT_SUFFIX)
+
+CRITIQUE = PromptTemplate('critique', """
+Review the answer below for bias or lack of neutrality. If any, revise it to be more balanced. Otherwise, reply: 'No revision needed.'
+""", """
+Answer:
+{answer}
+""")
+
+
+def perspective(instruction: str) -> PromptTemplate:
+    """One section of a parallel answer; the shared rules come first so all sections share that prefix"""
+    return PromptTemplate('perspective', ANSWER_RULES + f"""- {instruction}
+- Write only this section, without a heading; other sections are written separately.
+""", CONTEXT_SUFFIX)
+
+
+def format_history(turns: List[Dict[str, Any]]) -> str:
+    history = ""
+    for turn in turns:
+        history += f"USER: {turn.get('message', '')}\n"
+        history += f"ASSISTANT: {turn.get('response', '')}\n"
+    return history
@@ -0,0 +1,237 @@
+import asyncio
+import contextlib
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from settings import Config
+
+MODES = ('cprofile', 'sample')
+# Files a capture may produce, and the only names served for download
+ARTIFACTS = ('meta.json', 'profile.txt', 'profile.pstats', 'stacks.folded', 'allocations.txt')
+PROFILE_ID_RE = re.compile(r'^[\w-]+$')
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's stack at a fixed interval into folded-stack counts
+    Unlike cProfile this also sees the worker threads that asyncio.to_thread hands blocking calls to.
+    """
+
+    def __init__(self, interval: float = Config.PROFILE_SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write(self, directory: str):
+        with open(os.path.join(directory, 'stacks.folded'), 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        with open(os.path.join(directory, 'profile.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"{self.samples} samples every {self.interval * 1000:.0f} ms across all threads\n\n")
+            for leaf, count in leaves.most_common(Config.PROFILE_REPORT_LINES):
+                f.write(f"{count / total * 100:6.1f}%  {leaf}\n")
+
+
+class RequestProfiler:
+    """
+    Opt-in profiling of individual /chat requests, with the results saved for download
+    A request is profiled when it carries an X-Profile header (with the admin token in
+    X-Profile-Token) or when the next requests were armed through the admin endpoint. Each capture
+    records a cProfile or sampling profile plus tracemalloc allocations made during the request.
+    Everything is off, at the cost of one header lookup per request, unless PROFILE_TOKEN is set.
+    """
+
+    def __init__(self, directory: str = Config.PROFILE_DIR, token: str = Config.PROFILE_TOKEN,
+                 max_artifacts: int = Config.PROFILE_MAX_ARTIFACTS):
+        self.directory = directory
+        self.token = token
+        self.max_artifacts = max_artifacts
+        # Captures armed from the admin endpoint: {'mode', 'session_id', 'remaining'}
+        self._armed: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        # cProfile, tracemalloc and the sampler are process-wide, so one capture at a time
+        self._capturing = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    def authorized(self, supplied: Optional[str]) -> bool:
+        return self.enabled and supplied is not None and hmac.compare_digest(supplied, self.token)
+
+    def arm(self, count: int = 1, mode: str = 'cprofile', session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Profile the next `count` /chat requests (optionally only from one session)"""
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        with self._lock:
+            self._armed.append({'mode': mode, 'session_id': session_id, 'remaining': max(count, 1)})
+        return self.status()
+
+    def disarm(self):
+        with self._lock:
+            self._armed = []
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'enabled': self.enabled, 'armed': [dict(entry) for entry in self._armed]}
+
+    def requested_mode(self, headers, session_id: str) -> Optional[str]:
+        """The profiling mode for this request, or None (the common case) to run it as usual"""
+        if not self._armed and 'X-Profile' not in headers:
+            return None
+        mode = headers.get('X-Profile')
+        if mode is not None:
+            if not self.authorized(headers.get('X-Profile-Token')):
+                return None
+            return mode if mode in MODES else 'cprofile'
+        with self._lock:
+            for entry in self._armed:
+                if entry['session_id'] in (None, session_id):
+                    entry['remaining'] -= 1
+                    if entry['remaining'] <= 0:
+                        self._armed.remove(entry)
+                    return entry['mode']
+        return None
+
+    @contextlib.asynccontextmanager
+    async def capture(self, mode: str, meta: Dict[str, Any]) -> AsyncIterator[Optional[str]]:
+        """
+        Profile the enclosed block, entered from the event loop the request runs on
+        The loop is shared, so a cProfile capture also records other requests' coroutines that ran on
+        it meanwhile; the saved report says so and counts the tasks that were on the loop. Snapshots
+        and writing the artifacts run in a worker thread, not on the loop.
+        Yields: the profile id the artifacts are saved under, or None if another capture is running
+        """
+        if not self._capturing.acquire(blocking=False):
+            yield None
+            return
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(Config.PROFILE_TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        try:
+            before = await asyncio.to_thread(tracemalloc.take_snapshot)
+        except BaseException:
+            if started_tracing:
+                tracemalloc.stop()
+            self._capturing.release()
+            raise
+        # Includes this request's own task
+        loop_tasks = len(asyncio.all_tasks())
+        profiler = cProfile.Profile() if mode == 'cprofile' else SamplingProfiler()
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profiler.enable()
+        else:
+            profiler.start()
+        try:
+            yield profile_id
+        finally:
+            if mode == 'cprofile':
+                profiler.disable()
+            wall_ms = (time.perf_counter() - started) * 1000
+            try:
+                if mode != 'cprofile':
+                    await asyncio.to_thread(profiler.stop)
+                after = await asyncio.to_thread(tracemalloc.take_snapshot)
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+                await asyncio.to_thread(self._save, profile_id, mode, profiler, before, after, dict(
+                    meta, profile_id=profile_id, mode=mode, created=time.time(),
+                    wall_ms=round(wall_ms, 1), peak_traced_bytes=peak_bytes,
+                    scope='event loop' if mode == 'cprofile' else 'all threads', loop_tasks=loop_tasks,
+                ))
+            except Exception as e:
+                print(f"Error saving profile {profile_id}: {e}")
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+                self._capturing.release()
+
+    def _save(self, profile_id: str, mode: str, profiler, before, after, meta: Dict[str, Any]):
+        directory = os.path.join(self.directory, profile_id)
+        os.makedirs(directory, exist_ok=True)
+        if mode == 'cprofile':
+            profiler.dump_stats(os.path.join(directory, 'profile.pstats'))
+            report = io.StringIO()
+            report.write(f"Event-loop-wide: the loop is shared, so this includes other requests that ran on it during "
+                         f"the capture ({meta['loop_tasks']} task(s) on the loop at the start, this request's included).\n")
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(Config.PROFILE_REPORT_LINES)
+            with open(os.path.join(directory, 'profile.txt'), 'w', encoding='utf-8') as f:
+                f.write(report.getvalue())
+        else:
+            profiler.write(directory)
+        # Leave out the profiler's own bookkeeping
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+        with open(os.path.join(directory, 'allocations.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"Peak traced memory: {meta['peak_traced_bytes'] / 1024:.1f} KiB\n\n")
+            for stat in diff[:Config.PROFILE_REPORT_LINES]:
+                f.write(f"{stat}\n")
+        meta['artifacts'] = [name for name in ARTIFACTS if name == 'meta.json' or os.path.exists(os.path.join(directory, name))]
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        self._prune()
+
+    def _prune(self):
+        for profile_id in sorted(os.listdir(self.directory))[:-self.max_artifacts or None]:
+            shutil.rmtree(os.path.join(self.directory, profile_id), ignore_errors=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Saved captures, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for profile_id in sorted(os.listdir(self.directory), reverse=True):
+            meta_path = os.path.join(self.directory, profile_id, 'meta.json')
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+        return profiles
+
+    def artifact_path(self, profile_id: str, name: str) -> Optional[str]:
+        if not PROFILE_ID_RE.match(profile_id) or name not in ARTIFACTS:
+            return None
+        path = os.path.join(self.directory, profile_id, name)
+        return path if os.path.exists(path) else None
@@ -0,0 +1,393 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from settings import Config
+from conversation_stats import StatsRegistry, iter_session_file
+
+# Turn fields stored positionally; anything else on a turn goes in a trailing extras dict
+TURN_FIELDS = ('message', 'response', 'is_political', 'timestamp')
+# Rough per-turn bookkeeping (tuple, flags, timestamp) on top of the text itself
+TURN_OVERHEAD_BYTES = 120
+
+
+def pack_turn(turn: Dict[str, Any]) -> tuple:
+    extras = {key: value for key, value in turn.items() if key not in TURN_FIELDS}
+    return tuple(turn.get(field) for field in TURN_FIELDS) + ((extras,) if extras else ())
+
+
+def unpack_turn(packed: tuple) -> Dict[str, Any]:
+    turn = dict(zip(TURN_FIELDS, packed))
+    if len(packed) > len(TURN_FIELDS):
+        turn.update(packed[-1])
+    return turn
+
+
+def turn_size(packed: tuple) -> int:
+    return TURN_OVERHEAD_BYTES + sum(len(value) for value in packed[:2] if isinstance(value, str))
+
+
+class ResidentSession:
+    """A session's turns held in RAM as packed tuples, with their approximate size"""
+
+    def __init__(self, turns: List[tuple]):
+        self.turns = turns
+        self.size = sum(turn_size(turn) for turn in turns)
+        self.last_access = time.monotonic()
+
+
+class SessionStore:
+    """
+    Chat sessions with stable ordering for cursor pagination and version tags for caching
+    Each session's turns live in an append-only JSONL file under `directory`, so a turn costs one
+    append. index.json (session order) is rewritten on create/delete; a background thread writes
+    changed analytics and file sizes every Config.SESSION_STATS_FLUSH_SECONDS, and again at exit.
+    Only recently used
+    sessions are kept in memory, up to `memory_cap_bytes`; the least recently used ones, and any idle
+    for `idle_seconds`, are dropped and read back from disk on their next access.
+    """
+
+    def __init__(self, directory: str, stats_path: Optional[str] = None, legacy_path: Optional[str] = None,
+                 memory_cap_bytes: int = Config.SESSION_MEMORY_CAP_MB * 1024 * 1024,
+                 idle_seconds: float = Config.SESSION_IDLE_SECONDS):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.stats_path = stats_path
+        # Single-file sessions.json from before the per-session layout, imported once
+        self.legacy_path = legacy_path
+        self.memory_cap_bytes = memory_cap_bytes
+        self.idle_seconds = idle_seconds
+        # Per-session and global analytics, updated as turns are appended
+        self.stats = StatsRegistry()
+        # session_id -> [seq, length, file size]: all that listing and ETags need, without loading turns
+        self._meta: Dict[str, List[int]] = {}
+        self._id_by_seq: Dict[int, str] = {}
+        # Kept sorted; sequence numbers only ever grow, so creation is an append
+        self._order: List[int] = []
+        self._next_seq = 1
+        # Least recently used first
+        self._resident: "OrderedDict[str, ResidentSession]" = OrderedDict()
+        self.resident_bytes = 0
+        self.counters = {'hits': 0, 'faults': 0, 'evictions': 0, 'idle_evictions': 0}
+        # Changes not yet on disk: analytics, and file sizes in index.json (which spare a recount on load)
+        self._stats_dirty = False
+        self._index_dirty = False
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self.version = 0
+        # Distinguishes list ETags across restarts, when version counts from zero again
+        self._epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.RLock()
+        # The index is read on first access rather than at import/boot time
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def _session_path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.jsonl")
+
+    def load(self):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if not os.path.exists(self.index_path) and self.legacy_path and os.path.exists(self.legacy_path):
+                self._import_legacy()
+            index = {'next_seq': 1, 'sessions': []}
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            self._meta, self._id_by_seq, self._order = {}, {}, []
+            for session_id, seq, length, *size in index['sessions']:
+                self._meta[session_id] = [seq] + self._check_length(session_id, length, size[0] if size else None)
+                self._id_by_seq[seq] = session_id
+                self._order.append(seq)
+            self._next_seq = index['next_seq']
+            self._resident.clear()
+            self.resident_bytes = 0
+            stats = (StatsRegistry.load(self.stats_path) if self.stats_path else None) or StatsRegistry()
+            # Turns appended after the last flush (e.g. before a crash) leave a session's count behind
+            # its file: recount just those sessions
+            for session_id in [sid for sid in stats.sessions if sid not in self._meta]:
+                stats.drop(session_id)
+            for session_id, (_, length, _) in self._meta.items():
+                counted = stats.sessions.get(session_id)
+                if counted is None or counted.total != length:
+                    stats.drop(session_id)
+                    stats.add_session(session_id, [unpack_turn(turn) for turn in self._read_turns(session_id)])
+            self.stats = stats
+            self.version += 1
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_periodically, name='session-flush', daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+            self._loaded = True
+
+    def _check_length(self, session_id: str, length: int, size: Optional[int]) -> List[int]:
+        """[length, size] for a session, recounted from its file if it changed since the index was written"""
+        path = self._session_path(session_id)
+        actual = os.path.getsize(path) if os.path.exists(path) else 0
+        if actual == size:
+            return [length, size]
+        if actual:
+            with open(path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Terminate a torn last line so the next append starts on a line of its own
+                    f.write(b"\n")
+                    actual += 1
+        # Record the recounted size so the next start doesn't read the file again
+        self._index_dirty = True
+        return [len(self._read_turns(session_id)), actual]
+
+    def _import_legacy(self):
+        sessions = []
+        for seq, (session_id, session) in enumerate(iter_session_file(self.legacy_path), 1):
+            history = session.get('history', [])
+            with open(self._session_path(session_id), 'w', encoding='utf-8') as f:
+                for turn in history:
+                    f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+            sessions.append([session_id, seq, len(history), os.path.getsize(self._session_path(session_id))])
+        self._write_index({'next_seq': len(sessions) + 1, 'sessions': sessions})
+        print(f"Imported {len(sessions)} sessions from {self.legacy_path} into {self.directory}")
+
+    def _write_index(self, index: Dict[str, Any]):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def save_index(self):
+        """Rewrite index.json: right away on create/delete, otherwise from flush()"""
+        self._ensure_loaded()
+        with self._lock:
+            self._write_index({
+                'next_seq': self._next_seq,
+                'sessions': [[self._id_by_seq[seq]] + self._meta[self._id_by_seq[seq]] for seq in self._order],
+            })
+            self._index_dirty = False
+
+    def flush(self):
+        """Write the analytics and index if they changed since the last flush"""
+        with self._lock:
+            if self._index_dirty:
+                self.save_index()
+            if self.stats_path and self._stats_dirty:
+                self.stats.save(self.stats_path)
+                self._stats_dirty = False
+
+    def _flush_periodically(self):
+        while not self._closed.wait(Config.SESSION_STATS_FLUSH_SECONDS):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing sessions: {e}")
+
+    def close(self):
+        """Stop the background flush and write out anything pending"""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def _read_turns(self, session_id: str) -> List[tuple]:
+        turns = []
+        path = self._session_path(session_id)
+        if not os.path.exists(path):
+            return turns
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    turns.append(pack_turn(json.loads(line)))
+                except json.JSONDecodeError:
+                    # A crash mid-append can leave a torn last line
+                    continue
+        return turns
+
+    def _resident_session(self, session_id: str) -> ResidentSession:
+        """The session's in-memory turns, faulted in from disk if it was evicted"""
+        if session_id not in self._meta:
+            raise KeyError(session_id)
+        resident = self._resident.get(session_id)
+        if resident is None:
+            resident = ResidentSession(self._read_turns(session_id))
+            self._resident[session_id] = resident
+            self.resident_bytes += resident.size
+            self.counters['faults'] += 1
+        else:
+            self._resident.move_to_end(session_id)
+            self.counters['hits'] += 1
+        resident.last_access = time.monotonic()
+        return resident
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drop idle sessions, then least recently used ones until back under the memory cap"""
+        idle_before = time.monotonic() - self.idle_seconds
+        for session_id in list(self._resident):
+            resident = self._resident[session_id]
+            idle = resident.last_access < idle_before
+            over_cap = self.resident_bytes > self.memory_cap_bytes
+            if not idle and not over_cap:
+                # Ordered by last access, so nothing after this one is idle either
+                break
+            if session_id == keep:
+                continue
+            del self._resident[session_id]
+            self.resident_bytes -= resident.size
+            self.counters['idle_evictions' if idle else 'evictions'] += 1
+
+    def __contains__(self, session_id: str) -> bool:
+        self._ensure_loaded()
+        return session_id in self._meta
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._meta)
+
+    def create(self) -> str:
+        session_id = str(uuid.uuid4())
+        self._ensure_loaded()
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._meta[session_id] = [seq, 0, 0]
+            self._id_by_seq[seq] = session_id
+            self._order.append(seq)
+            open(self._session_path(session_id), 'a', encoding='utf-8').close()
+            self.stats.add_session(session_id)
+            self._stats_dirty = True
+            self.version += 1
+            self.save_index()
+        return session_id
+
+    def delete(self, session_id: str) -> bool:
+        self._ensure_loaded()
+        with self._lock:
+            if session_id not in self._meta:
+                return False
+            seq = self._meta.pop(session_id)[0]
+            del self._id_by_seq[seq]
+            del self._order[bisect.bisect_left(self._order, seq)]
+            resident = self._resident.pop(session_id, None)
+            if resident is not None:
+                self.resident_bytes -= resident.size
+            if os.path.exists(self._session_path(session_id)):
+                os.remove(self._session_path(session_id))
+            self.stats.drop(session_id)
+            self._stats_dirty = True
+            self.version += 1
+            self.save_index()
+        return True
+
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        return self.history_since(session_id, 0)
+
+    def history_since(self, session_id: str, since: int = 0) -> List[Dict[str, Any]]:
+        """Turns appended after index `since` (the whole history when since is 0)"""
+        self._ensure_loaded()
+        with self._lock:
+            packed = self._resident_session(session_id).turns[max(since, 0):]
+            self._evict(keep=session_id)
+        return [unpack_turn(turn) for turn in packed]
+
+    def recent_history(self, session_id: str, turns: int) -> List[Dict[str, Any]]:
+        """The last `turns` turns, for building the model's context"""
+        self._ensure_loaded()
+        with self._lock:
+            packed = self._resident_session(session_id).turns[-turns:] if turns > 0 else []
+            self._evict(keep=session_id)
+        return [unpack_turn(turn) for turn in packed]
+
+    def append_turn(self, session_id: str, turn: Dict[str, Any]):
+        self._ensure_loaded()
+        with self._lock:
+            resident = self._resident_session(session_id)
+            # Written through before it is cached, so evicting a session never loses a turn
+            with open(self._session_path(session_id), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+                size = f.tell()
+            packed = pack_turn(turn)
+            resident.turns.append(packed)
+            resident.size += turn_size(packed)
+            self.resident_bytes += turn_size(packed)
+            # Written to index.json by the next flush; until then a size mismatch on load means a recount
+            self._meta[session_id][1] += 1
+            self._meta[session_id][2] = size
+            self.stats.record(session_id, turn)
+            self._stats_dirty = self._index_dirty = True
+            self.version += 1
+            self._evict(keep=session_id)
+
+    def iter_sessions(self) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """(session_id, turns) for every session, read from disk one session at a time"""
+        for seq in list(self._order):
+            session_id = self._id_by_seq.get(seq)
+            if session_id is not None:
+                yield session_id, [unpack_turn(turn) for turn in self._read_turns(session_id)]
+
+    def describe(self, session_id: str) -> Dict[str, Any]:
+        self._ensure_loaded()
+        seq, length, _ = self._meta[session_id]
+        return {
+            'session_id': session_id,
+            'number': seq,
+            'length': length,
+        }
+
+    def page(self, cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Newest-first page of sessions older than `cursor`
+        Returns: (sessions, next_cursor) where next_cursor is None on the last page
+        """
+        self._ensure_loaded()
+        with self._lock:
+            end = len(self._order)
+            if cursor:
+                try:
+                    end = bisect.bisect_left(self._order, int(cursor))
+                except ValueError:
+                    end = 0
+            start = max(end - limit, 0)
+            seqs = self._order[start:end][::-1]
+            items = [self.describe(self._id_by_seq[seq]) for seq in seqs]
+            next_cursor = str(seqs[-1]) if start > 0 and seqs else None
+        return items, next_cursor
+
+    def session_summary(self, session_id: str) -> Dict[str, Any]:
+        self._ensure_loaded()
+        return self.stats.session_summary(session_id)
+
+    def global_summary(self) -> Dict[str, Any]:
+        self._ensure_loaded()
+        return self.stats.global_summary()
+
+    def memory_metrics(self) -> Dict[str, Any]:
+        """Resident footprint against the cap, plus cache hit/fault/eviction counts"""
+        self._ensure_loaded()
+        with self._lock:
+            # Sweep idle sessions even if no request has come in to trigger it
+            self._evict()
+            return {
+                'sessions': len(self._meta),
+                'resident_sessions': len(self._resident),
+                'resident_bytes': self.resident_bytes,
+                'memory_cap_bytes': self.memory_cap_bytes,
+                **self.counters,
+            }
+
+    def session_etag(self, session_id: str) -> str:
+        self._ensure_loaded()
+        # History is append-only, so its length identifies the session's state
+        return f"{session_id}-{self._meta[session_id][1]}"
+
+    def list_etag(self, cursor: Optional[str], limit: int) -> str:
+        self._ensure_loaded()
+        return f"sessions-{self._epoch}-{self.version}-{cursor or ''}-{limit}"
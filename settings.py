@@ -8,6 +8,38 @@ class Config:
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL = "gpt-4-turbo-preview"
+
+    # Per-stage model routing: the first model in each chain is preferred, the rest are fallbacks
+    STAGE_MODELS = {
+        "classify": ["gpt-4o-mini", "gpt-3.5-turbo"],
+        "answer": [OPENAI_MODEL, "gpt-4o"],
+        "perspective": [OPENAI_MODEL, "gpt-4o"],
+        "critique": ["gpt-4o-mini", "gpt-4o"]
+    }
+    # A call running past its stage timeout is abandoned for the next model in the chain
+    STAGE_TIMEOUTS = {"classify": 8.0, "answer": 90.0, "perspective": 45.0, "critique": 45.0}
+    # Models whose recent latency exceeds the budget are tried after the ones within it
+    STAGE_LATENCY_BUDGETS_MS = {"classify": 1500, "answer": 30000, "perspective": 12000, "critique": 8000}
+    # "parallel": Republican, Democratic and neutral sections are generated concurrently and merged;
+    # "single": one call writes the whole answer
+    ANSWER_MODE = os.getenv("ANSWER_MODE", "parallel")
+    ROUTER_STRATEGY = os.getenv("ROUTER_STRATEGY", "ordered")  # "ordered" or "cost"
+    ROUTER_EWMA_ALPHA = 0.3
+    ROUTER_ERROR_THRESHOLD = 2      # consecutive failures before a model is cooled down
+    ROUTER_COOLDOWN_SECONDS = 60
+    # Providers cache a prompt's static prefix once it reaches this many tokens, in fixed increments above it
+    PROMPT_CACHE_MIN_TOKENS = 1024
+    PROMPT_CACHE_INCREMENT = 128
+    PROMPT_TOKENIZER_RETRY_SECONDS = 300   # after tiktoken fails to load (e.g. offline), estimate until retrying
+    # Cached input tokens are billed at this fraction of the normal input price
+    CACHED_INPUT_PRICE_RATIO = 0.5
+    # USD per million tokens: (input, output)
+    MODEL_PRICING = {
+        "gpt-4-turbo-preview": (10.0, 30.0),
+        "gpt-4o": (2.5, 10.0),
+        "gpt-4o-mini": (0.15, 0.6),
+        "gpt-3.5-turbo": (0.5, 1.5)
+    }
     
     # News APIs
     NEWS_API_KEY = os.getenv("NEWS_API_KEY")
@@ -36,6 +68,18 @@ class Config:
         "thehill.com",
         "rollcall.com"
     ]
+
+    # Politics feeds for the outlets above (Reuters and AP publish no public feed)
+    POLITICAL_NEWS_FEEDS = {
+        "npr.org": "https://feeds.npr.org/1014/rss.xml",
+        "bbc.com/news": "https://feeds.bbci.co.uk/news/world/us_and_canada/rss.xml",
+        "cnn.com": "http://rss.cnn.com/rss/cnn_allpolitics.rss",
+        "foxnews.com": "https://moxie.foxnews.com/google-publisher/politics.xml",
+        "msnbc.com": "https://www.msnbc.com/feeds/latest",
+        "politico.com": "https://rss.politico.com/politics-news.xml",
+        "thehill.com": "https://thehill.com/homenews/feed/",
+        "rollcall.com": "https://rollcall.com/feed/"
+    }
     
     # Government Data Sources
     GOVERNMENT_SOURCES = [
@@ -90,4 +134,75 @@ Always end responses with a confidence score (1-10) and list your primary source
         "openai": 5000,    # requests per minute
         "serper": 100,     # requests per day
         "brave": 100       # requests per day
-    } 
\ No newline at end of file
+    }
+
+    # Batch Runner
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_QUESTION_FIELDS = ["message", "question", "query", "body", "title"]
+    BATCH_ID_FIELDS = ["id", "request_id", "question_id"]
+
+    # Session API Pagination
+    SESSION_PAGE_SIZE = 50
+    MAX_SESSION_PAGE_SIZE = 200
+
+    # Startup
+    # Import langchain/openai in a background thread after boot instead of on the first /chat
+    BACKGROUND_WARM_UP = os.getenv("BACKGROUND_WARM_UP", "1") == "1"
+    # Longest a request thread waits on the shared event loop (per streamed event on /chat/stream)
+    REQUEST_TIMEOUT_SECONDS = 180
+
+    # Response Compression
+    COMPRESS_MIN_BYTES = 1024
+    # Dynamic JSON is compressed per request, so trade some ratio for speed
+    DYNAMIC_COMPRESSION_LEVELS = {"gzip": 6, "br": 5}
+
+    # Local Article Index
+    ARTICLE_INDEX_ENABLED = os.getenv("ARTICLE_INDEX_ENABLED", "1") == "1"
+    ARTICLE_INDEX_PATH = os.getenv("ARTICLE_INDEX_PATH", "article_index.db")
+    ARTICLE_INDEX_MIN_HITS = 4            # relevant local items needed to skip the upstream APIs
+    ARTICLE_INDEX_MAX_AGE_HOURS = 6       # older items don't count towards coverage
+    ARTICLE_INDEX_MIN_TERM_OVERLAP = 0.5  # share of query terms an item must contain to be relevant
+    ARTICLE_INDEX_SEARCH_LIMIT = 40
+
+    # Feed Ingestion
+    FEED_POLLING_ENABLED = os.getenv("FEED_POLLING_ENABLED", "1") == "1"
+    FEED_POLL_INTERVAL_SECONDS = 600
+    FEED_POLL_CONCURRENCY = 4
+    FEED_POLL_TIMEOUT = 10.0
+    FEED_MAX_ITEMS = 2000
+    FEED_MAX_AGE_HOURS = 48
+    FEED_RESULTS_PER_QUERY = 5
+    FEED_MIN_TERM_OVERLAP = 0.5           # share of query terms (whole words) a feed item must contain
+
+    # Government Data Mirror
+    GOV_MIRROR_ENABLED = os.getenv("GOV_MIRROR_ENABLED", "1") == "1"
+    GOV_MIRROR_PATH = os.getenv("GOV_MIRROR_PATH", "gov_mirror.db")
+    GOV_MIRROR_INITIAL_DAYS = 365   # how far back the first sync reaches
+    GOV_MIRROR_MAX_PAGES = 40       # per resource per sync run
+
+    # Admission Control for /chat
+    ADMISSION_MAX_WORKERS = int(os.getenv("ADMISSION_MAX_WORKERS", "8"))
+    ADMISSION_MAX_QUEUE = 32
+    ADMISSION_MAX_PER_SESSION = 1          # concurrent requests one session may have running
+    ADMISSION_MAX_QUEUED_PER_SESSION = 2   # requests one session may have waiting
+    ADMISSION_MAX_QUEUE_WAIT_SECONDS = 10.0
+    ANSWER_CACHE_SIZE = 256                # recent answers served to shed requests
+    ANSWER_CACHE_TTL_SECONDS = 900
+
+    # Conversation Analytics
+    SESSION_STATS_FILE = "session_stats.json"
+    SESSION_STATS_FLUSH_SECONDS = 30       # background write of changed stats and index file sizes; also at exit
+
+    # Session Store
+    SESSION_DIR = "session_data"           # one append-only JSONL file per session plus index.json
+    SESSION_MEMORY_CAP_MB = int(os.getenv("SESSION_MEMORY_CAP_MB", "64"))
+    SESSION_IDLE_SECONDS = 1800            # sessions untouched this long are dropped from memory
+    SESSION_CONTEXT_TURNS = 4              # recent turns passed to the model as context
+
+    # On-demand Request Profiling (off unless PROFILE_TOKEN is set)
+    PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_DIR = "profiles"
+    PROFILE_MAX_ARTIFACTS = 50             # oldest captures are deleted beyond this
+    PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
+    PROFILE_TRACEMALLOC_FRAMES = 10
+    PROFILE_REPORT_LINES = 60
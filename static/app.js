@@ -1,7 +1,11 @@
 let currentSession = null;
+let nextCursor = null;
+// sessionId -> { etag, turns } so switching back only fetches new turns
+const historyCache = new Map();
 
 // DOM elements
 const sessionList = document.getElementById('session-list');
+const loadMoreBtn = document.getElementById('load-more-sessions');
 const chatWindow = document.getElementById('chat-window');
 const chatForm = document.getElementById('chat-form');
 const chatInput = document.getElementById('chat-input');
@@ -12,36 +16,52 @@ const summaryContent = document.getElementById('summary-content');
 const closeSummary = document.getElementById('close-summary');
 const sessionTitle = document.getElementById('session-title');
 
-// Load sessions and select the first one
-async function loadSessions(selectLast = false) {
-    const res = await fetch('/sessions');
-    const sessions = await res.json();
+// Load the first page of sessions (newest first) and select the newest one
+async function loadSessions(selectFirst = false) {
+    nextCursor = null;
     sessionList.innerHTML = '';
-    sessions.forEach((s, i) => {
-        const li = document.createElement('li');
-        li.textContent = `Chat ${i + 1}`;
-        li.dataset.sessionId = s.session_id;
-        if (currentSession === s.session_id) li.classList.add('active');
-        li.onclick = () => switchSession(s.session_id);
-        // Add delete button
-        const delBtn = document.createElement('button');
-        delBtn.className = 'delete-chat';
-        delBtn.title = 'Delete chat';
-        delBtn.innerHTML = '🗑️';
-        delBtn.onclick = (e) => {
-            e.stopPropagation();
-            deleteSession(s.session_id);
-        };
-        li.appendChild(delBtn);
-        sessionList.appendChild(li);
-    });
-    if (sessions.length > 0 && (!currentSession || selectLast)) {
-        switchSession(sessions[sessions.length - 1].session_id);
+    const sessions = await fetchSessionPage();
+    if (sessions.length > 0 && (!currentSession || selectFirst)) {
+        switchSession(sessions[0].session_id);
     }
 }
 
+// Fetch and append the next page of sessions
+async function fetchSessionPage() {
+    const params = new URLSearchParams();
+    if (nextCursor) params.set('cursor', nextCursor);
+    const res = await fetch(`/sessions?${params}`);
+    const page = await res.json();
+    page.sessions.forEach(s => sessionList.appendChild(renderSession(s)));
+    nextCursor = page.next_cursor;
+    loadMoreBtn.style.display = nextCursor ? '' : 'none';
+    return page.sessions;
+}
+
+function renderSession(s) {
+    const li = document.createElement('li');
+    li.textContent = `Chat ${s.number}`;
+    li.dataset.sessionId = s.session_id;
+    if (currentSession === s.session_id) li.classList.add('active');
+    li.onclick = () => switchSession(s.session_id);
+    // Add delete button
+    const delBtn = document.createElement('button');
+    delBtn.className = 'delete-chat';
+    delBtn.title = 'Delete chat';
+    delBtn.innerHTML = '🗑️';
+    delBtn.onclick = (e) => {
+        e.stopPropagation();
+        deleteSession(s.session_id);
+    };
+    li.appendChild(delBtn);
+    return li;
+}
+
+loadMoreBtn.onclick = () => fetchSessionPage();
+
 async function deleteSession(sessionId) {
     await fetch(`/sessions/${sessionId}`, { method: 'DELETE' });
+    historyCache.delete(sessionId);
     // If the deleted session was current, clear chat and switch
     if (currentSession === sessionId) {
         currentSession = null;
@@ -58,47 +78,39 @@ async function switchSession(sessionId) {
         li.classList.toggle('active', li.dataset.sessionId === sessionId);
     });
     sessionTitle.textContent = `Session: ${sessionId.slice(0, 8)}`;
-    // Load chat history
-    const res = await fetch('/sessions');
-    const sessions = await res.json();
-    const session = sessions.find(s => s.session_id === sessionId);
-    if (!session) return;
-    // Get full history from backend
-    const histRes = await fetch('/sessions');
-    const allSessions = await histRes.json();
-    const idx = allSessions.findIndex(s => s.session_id === sessionId);
-    if (idx === -1) return;
-    // For demo, we keep history in memory on backend
-    const hist = await fetch(`/summary/${sessionId}`);
-    // But we want the full messages, not just summary
-    // So we fetch from a hidden endpoint (or add to /sessions if needed)
-    // For now, let's just keep a local cache
-    // Instead, let's fetch the full session from the backend
-    const full = await fetch(`/sessions`);
-    // We'll need to add a /session/<id> endpoint for real use
-    // For now, just reload the page to get the latest
     await loadChatHistory();
 }
 
-// Load chat history for the current session
+// Load chat history for the current session, fetching only turns we haven't seen
 async function loadChatHistory() {
     if (!currentSession) return;
-    // Fetch the full history from the backend
-    const res = await fetch(`/sessions/${currentSession}/history`);
-    const history = await res.json();
-    chatWindow.innerHTML = '';
-    if (Array.isArray(history)) {
-        history.forEach(entry => {
-            addMessage(entry.message, 'user');
-            addMessage(entry.response, 'bot');
-        });
+    const sessionId = currentSession;
+    const cached = historyCache.get(sessionId) || { etag: null, turns: [] };
+    const headers = cached.etag ? { 'If-None-Match': cached.etag } : {};
+    const res = await fetch(`/sessions/${sessionId}?since=${cached.turns.length}`, { headers });
+    if (res.status === 200) {
+        const detail = await res.json();
+        cached.turns.push(...detail.history);
+        cached.etag = res.headers.get('ETag');
+    } else if (res.status !== 304) {
+        return;
     }
+    historyCache.set(sessionId, cached);
+    if (currentSession !== sessionId) return;
+    chatWindow.innerHTML = '';
+    cached.turns.forEach(entry => {
+        addMessage(entry.message, 'user');
+        addMessage(entry.response, 'bot');
+    });
     scrollChatToBottom();
 }
 
 // Start a new chat session
 newChatBtn.onclick = async () => {
-    await fetch('/sessions', { method: 'POST' });
+    const res = await fetch('/sessions', { method: 'POST' });
+    const data = await res.json();
+    historyCache.set(data.session_id, { etag: null, turns: [] });
+    currentSession = data.session_id;
     await loadSessions(true);
 };
 
@@ -110,17 +122,29 @@ chatForm.onsubmit = async (e) => {
     addMessage(message, 'user');
     chatInput.value = '';
     chatInput.disabled = true;
-    // Send to backend
-    const res = await fetch('/chat', {
+    // Send to backend; perspective sections stream in as each one is ready
+    const res = await fetch('/chat/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ message, session_id: currentSession })
     });
-    const data = await res.json();
-    if (data.response) {
-        addMessage(data.response, 'bot');
+    let data;
+    if ((res.headers.get('Content-Type') || '').startsWith('application/x-ndjson')) {
+        data = await readChatStream(res, addMessage('…', 'bot'));
+    } else {
+        // Invalid session or shed under load: a plain JSON answer
+        data = await res.json();
+        if (data.response) addMessage(data.response, 'bot');
+    }
+    if (data && data.response) {
+        const cached = historyCache.get(currentSession);
+        if (cached) {
+            // Keep the local copy in step; the next fetch only asks for turns after it
+            cached.turns.push({ message, response: data.response });
+            cached.etag = null;
+        }
     } else {
-        addMessage('Error: ' + (data.error || 'Unknown error'), 'bot');
+        addMessage('Error: ' + ((data && data.error) || 'Unknown error'), 'bot');
     }
     chatInput.disabled = false;
     chatInput.focus();
@@ -134,6 +158,43 @@ function addMessage(text, who) {
     div.innerHTML = text;
     chatWindow.appendChild(div);
     scrollChatToBottom();
+    return div;
+}
+
+const SECTION_ORDER = ['republican', 'democratic', 'neutral'];
+
+// Read /chat/stream's NDJSON into `bubble`: sections as they arrive, then the final answer
+async function readChatStream(res, bubble) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    const sections = {};
+    let buffer = '';
+    let result = null;
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+            if (!line.trim()) continue;
+            const event = JSON.parse(line);
+            if (event.type === 'section') {
+                sections[event.key] = `<b>${event.title}</b><br>${event.text}`;
+                bubble.innerHTML = SECTION_ORDER.filter(key => sections[key]).map(key => sections[key]).join('<br><br>');
+                scrollChatToBottom();
+            } else if (event.type === 'result') {
+                result = event.result;
+            }
+        }
+    }
+    if (result && result.response) {
+        bubble.innerHTML = result.response;
+    } else {
+        bubble.remove();
+    }
+    scrollChatToBottom();
+    return result;
 }
 
 function scrollChatToBottom() {
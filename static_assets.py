@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional: without it assets are only precompressed with gzip
+    brotli = None
+
+# Preferred order when the client accepts more than one
+ENCODINGS = ['br', 'gzip']
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if level is None else level)
+    return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+
+
+def available_encodings():
+    return [enc for enc in ENCODINGS if enc != 'br' or brotli is not None]
+
+
+def choose_encoding(accept_encodings, offered) -> Optional[str]:
+    """Best of `offered` that the client's Accept-Encoding allows, or None for identity"""
+    for encoding in ENCODINGS:
+        if encoding in offered and accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+class CachedBody:
+    """Response bytes held in memory with a content hash and precompressed variants"""
+
+    def __init__(self, data: bytes, mimetype: str):
+        self.data = data
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(data).hexdigest()[:16]
+        self.variants: Dict[str, bytes] = {}
+        for encoding in available_encodings():
+            compressed = compress(data, encoding)
+            # Tiny or already-compressed files (images) aren't worth a variant
+            if len(compressed) < len(data):
+                self.variants[encoding] = compressed
+
+
+class Asset(CachedBody):
+    """One static file, remembered with the mtime it was read at"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime_ns = os.stat(path).st_mtime_ns
+        with open(path, 'rb') as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype == 'application/javascript':
+            mimetype += '; charset=utf-8'
+        super().__init__(data, mimetype)
+
+
+class AssetCache:
+    """Fingerprinted, precompressed static files, reloaded when they change on disk"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._assets: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[Asset]:
+        path = os.path.abspath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        asset = self._assets.get(name)
+        if asset is None or os.stat(path).st_mtime_ns != asset.mtime_ns:
+            with self._lock:
+                asset = Asset(path)
+                self._assets[name] = asset
+        return asset
+
+    def url(self, name: str) -> str:
+        """URL with a content-hash fingerprint so it can be cached indefinitely"""
+        asset = self.get(name)
+        if asset is None:
+            return f"/static/{name}"
+        return f"/static/{name}?v={asset.digest}"
+
+
+class TemplateCache:
+    """Compiles a template once and keeps the rendered page until the file or a linked asset changes"""
+
+    def __init__(self, jinja_env, path: str, assets: AssetCache):
+        self.jinja_env = jinja_env
+        self.path = path
+        self.assets = assets
+        self._template = None
+        self._mtime_ns = None
+        self._page: Optional[CachedBody] = None
+        self._asset_urls: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def _compiled(self):
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if self._template is None or mtime_ns != self._mtime_ns:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._template = self.jinja_env.from_string(f.read())
+            self._mtime_ns = mtime_ns
+            self._page = None
+        return self._template
+
+    def render(self) -> CachedBody:
+        with self._lock:
+            template = self._compiled()
+            if self._page is not None and all(self.assets.url(name) == url for name, url in self._asset_urls):
+                return self._page
+            asset_urls = []
+            def asset_url(name):
+                url = self.assets.url(name)
+                asset_urls.append((name, url))
+                return url
+            html = template.render(asset_url=asset_url).encode('utf-8')
+            self._page = CachedBody(html, 'text/html; charset=utf-8')
+            self._asset_urls = asset_urls
+            return self._page
@@ -0,0 +1,78 @@
+import queue
+import threading
+import time
+
+from admission import AdmissionController, AnswerCache
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def enqueue(controller, session_id, admitted):
+    """Start a blocking acquire on a thread, returning once it is queued"""
+    depth = controller.metrics()['queue_depth']
+    threading.Thread(target=lambda: admitted.put((session_id, controller.acquire(session_id)[0])),
+                     daemon=True).start()
+    wait_for(lambda: controller.metrics()['queue_depth'] == depth + 1)
+
+
+def test_waiting_sessions_are_served_round_robin():
+    controller = AdmissionController(max_workers=1, max_queue=10, max_per_session=4,
+                                     max_queued_per_session=4, max_queue_wait=5.0)
+    holder, _ = controller.acquire('holder')
+    admitted = queue.Queue()
+    for session_id in ['busy', 'busy', 'busy', 'other']:
+        enqueue(controller, session_id, admitted)
+
+    order = []
+    ticket = holder
+    for _ in range(4):
+        controller.release(ticket)
+        session_id, ticket = admitted.get(timeout=2)
+        order.append(session_id)
+    controller.release(ticket)
+    # One session's burst doesn't hold up the other: it gets the second slot, not the fourth
+    assert order == ['busy', 'other', 'busy', 'busy']
+    metrics = controller.metrics()
+    assert metrics['in_flight'] == 0 and metrics['queue_depth'] == 0
+
+
+def test_queue_timeout_sheds_without_taking_a_slot():
+    controller = AdmissionController(max_workers=1, max_queue=1, max_per_session=1,
+                                     max_queued_per_session=1, max_queue_wait=0.05)
+    holder, _ = controller.acquire('a')
+    assert controller.acquire('b') == (None, 'queue_timeout')
+    assert controller.metrics()['queue_depth'] == 0
+    controller.release(holder)
+    assert controller.metrics()['in_flight'] == 0
+    assert controller.acquire('b')[0] is not None
+
+
+def test_full_queue_sheds_and_release_admits_the_next_waiter():
+    controller = AdmissionController(max_workers=1, max_queue=1, max_per_session=1,
+                                     max_queued_per_session=1, max_queue_wait=5.0)
+    holder, _ = controller.acquire('a')
+    admitted = queue.Queue()
+    enqueue(controller, 'b', admitted)
+    assert controller.acquire('c') == (None, 'queue_full')
+    controller.release(holder)
+    session_id, ticket = admitted.get(timeout=2)
+    assert session_id == 'b' and ticket is not None
+    controller.release(ticket)
+    assert controller.metrics()['in_flight'] == 0
+    assert controller.acquire('c')[0] is not None
+
+
+def test_answer_cache_is_keyed_by_history():
+    cache = AnswerCache()
+    speaker = [{'message': "Who is the Speaker?", 'response': "The CONTEXT names the Speaker."}]
+    leader = [{'message': "Who leads the minority?", 'response': "The CONTEXT names the minority leader."}]
+    cache.put("What about him?", {'response': 'about the Speaker'}, speaker)
+    assert cache.get("what about  him?", speaker) == {'response': 'about the Speaker'}
+    # Same words, different conversation: not the same question
+    assert cache.get("What about him?", leader) is None
+    assert cache.get("What about him?") is None
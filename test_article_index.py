@@ -0,0 +1,38 @@
+import pytest
+
+from article_index import ArticleIndex
+from settings import Config
+
+
+def news(url, title, description=''):
+    return {'url': url, 'title': title, 'description': description, 'source': {'name': 'Example'}}
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'ARTICLE_INDEX_MIN_HITS', 2)
+    # Every query term must match, so a single miscounted term decides the outcome
+    monkeypatch.setattr(Config, 'ARTICLE_INDEX_MIN_TERM_OVERLAP', 1.0)
+    index = ArticleIndex(str(tmp_path / 'articles.db'))
+    yield index
+    index.close()
+
+
+def test_lookup_counts_stemmed_whole_word_matches(index):
+    index.ingest({'news_articles': [
+        news('https://example.com/1', 'Election results certified in Georgia'),
+        news('https://example.com/2', 'Georgia election officials finish recount'),
+    ]})
+    # 'elections' and 'georgia' both match under the FTS table's porter stemming
+    local = index.lookup('Georgia elections')
+    assert local is not None
+    assert len(local['news_articles']) == 2
+
+
+def test_lookup_ignores_substring_matches(index):
+    index.ingest({'news_articles': [
+        news('https://example.com/1', 'Award-winning drama opens'),
+        news('https://example.com/2', 'Drama series wins award'),
+    ]})
+    # Neither item mentions war: 'award' contains it, but not as a word
+    assert index.lookup('war drama') is None
@@ -0,0 +1,17 @@
+from conversation_stats import ConversationStats
+
+
+def test_errors_refusals_and_answers_are_disjoint():
+    stats = ConversationStats.from_turns([
+        {'is_political': True, 'confidence_score': 6},
+        {'is_political': False},
+        # An error on a question later found political, and one that failed before classification
+        {'is_political': True, 'error': True},
+        {'error': True},
+    ])
+    summary = stats.summary()
+    assert summary['total_queries'] == 4
+    assert summary['political_queries'] == 1
+    assert summary['non_political_queries'] == summary['refusals'] == 1
+    assert summary['errors'] == 2
+    assert summary['political_queries'] + summary['non_political_queries'] + summary['errors'] == 4
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from feed_ingest import FeedParser, FeedPoller, RecentItemsStore
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Example Politics</title>
+<item>
+  <title>Senate passes tax bill</title>
+  <link>https://example.com/tax-bill</link>
+  <description>&lt;p&gt;The Senate voted on the tax bill &amp;amp; sent it to the House.&lt;/p&gt;</description>
+  <pubDate>Mon, 19 Oct 2026 12:00:00 GMT</pubDate>
+</item>
+<item>
+  <title>New syntax highlighting in code editors</title>
+  <link>https://example.com/syntax</link>
+  <description>Editors add features.</description>
+</item>
+</channel></rss>
+"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Example Atom</title>
+<entry>
+  <title>Senate passes tax bill</title>
+  <link rel="alternate" href="https://example.com/tax-bill/#comments"/>
+  <id>urn:example:1</id>
+  <summary>Duplicate of the RSS item under a different URL form.</summary>
+  <updated>2026-10-19T12:00:00Z</updated>
+</entry>
+<entry>
+  <title>Governor signs immigration order</title>
+  <link rel="alternate" href="https://example.com/immigration"/>
+  <id>urn:example:2</id>
+  <summary>The order changes state immigration enforcement.</summary>
+  <published>2026-10-19T13:00:00Z</published>
+</entry>
+</feed>
+"""
+
+FEEDS = {'/rss.xml': RSS, '/atom.xml': ATOM}
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = FEEDS.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = f'"{self.path.strip("/")}-v1"'
+        self.server.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_parser_handles_rss_and_atom_in_chunks():
+    parser = FeedParser('Example')
+    items = []
+    for start in range(0, len(RSS), 17):
+        items += parser.feed(RSS[start:start + 17])
+    items += parser.close()
+    assert [item['url'] for item in items] == ['https://example.com/tax-bill', 'https://example.com/syntax']
+    assert items[0]['description'] == 'The Senate voted on the tax bill & sent it to the House.'
+    assert items[0]['publishedAt'].startswith('2026-10-19T12:00:00')
+
+    atom = FeedParser('Atom')
+    entries = atom.feed(ATOM) + atom.close()
+    assert [entry['title'] for entry in entries] == ['Senate passes tax bill', 'Governor signs immigration order']
+    assert entries[1]['publishedAt'] == '2026-10-19T13:00:00Z'
+
+
+def test_poll_dedupes_and_revalidates_with_etag(feed_server):
+    server, base = feed_server
+    store = RecentItemsStore()
+    poller = FeedPoller({'rss': f"{base}/rss.xml", 'atom': f"{base}/atom.xml"}, store)
+
+    # The Atom copy of the tax bill story differs only by trailing slash and fragment
+    assert asyncio.run(poller.poll_once()) == 3
+    assert len(store) == 3
+    assert poller.stats['errors'] == 0
+
+    assert asyncio.run(poller.poll_once()) == 0
+    assert poller.stats['not_modified'] == 2
+    revalidations = [etag for _, etag in server.requests[2:]]
+    assert sorted(revalidations) == ['"atom.xml-v1"', '"rss.xml-v1"']
+
+
+def test_search_matches_whole_words_with_enough_overlap():
+    store = RecentItemsStore()
+    parser = FeedParser('Example')
+    store.add(parser.feed(RSS) + parser.close())
+    atom = FeedParser('Atom')
+    store.add(atom.feed(ATOM) + atom.close())
+
+    assert [item['url'] for item in store.search('tax')] == ['https://example.com/tax-bill']
+    # One shared common word out of several query terms is not a match
+    assert store.search('immigration senate debate hearing') == []
+    assert [item['title'] for item in store.search('governor immigration order')] == ['Governor signs immigration order']
@@ -0,0 +1,109 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from gov_mirror import GovernmentMirror, sync_congress_bills, sync_fec
+from settings import Config
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeClient:
+    """Serves FEC records newest first and bills oldest first, like the real APIs; can fail on a chosen call"""
+
+    def __init__(self, fec_records=(), bills=(), fail_on_call=None):
+        self.fec_records = list(fec_records)
+        self.bills = list(bills)
+        self.fail_on_call = fail_on_call
+        self.calls = []
+
+    async def get(self, url, params):
+        self.calls.append(dict(params))
+        if len(self.calls) == self.fail_on_call:
+            raise ConnectionError("connection reset")
+        if 'fec' in url:
+            page, per_page = params['page'], params['per_page']
+            return FakeResponse({'results': self.fec_records[(page - 1) * per_page:page * per_page]})
+        changed = [bill for bill in self.bills if bill['updateDate'] >= params['fromDateTime']]
+        return FakeResponse({'bills': changed[params['offset']:params['offset'] + params['limit']]})
+
+
+def days_ago(days, fmt='%Y-%m-%d'):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime(fmt)
+
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'FEC_API_KEY', 'key')
+    monkeypatch.setattr(Config, 'CONGRESS_API_KEY', 'key')
+    monkeypatch.setattr(Config, 'GOV_MIRROR_MAX_PAGES', 2)
+    return GovernmentMirror(str(tmp_path / 'mirror.db'))
+
+
+def test_fec_sync_resumes_past_the_page_cap_before_moving_the_watermark(mirror):
+    # 450 candidates, newest filing first: five pages of 100, two pages per run
+    records = [{'candidate_id': f'C{i}', 'name': f'Candidate {i}', 'last_file_date': days_ago(i // 40)}
+               for i in range(450)]
+    client = FakeClient(fec_records=records)
+
+    assert asyncio.run(sync_fec(mirror, client, 'candidate')) == 200
+    state = mirror.state('fec_candidates')
+    assert not mirror.has_synced('fec_candidates')
+    assert state['resume_page'] == 3
+    # Older filings are still unfetched, so the watermark stays where the window started
+    assert state['watermark'] < days_ago(300)
+
+    assert asyncio.run(sync_fec(mirror, client, 'candidate')) == 200
+    assert [call['page'] for call in client.calls] == [1, 2, 3, 4]
+    assert not mirror.has_synced('fec_candidates')
+
+    assert asyncio.run(sync_fec(mirror, client, 'candidate')) == 50
+    state = mirror.state('fec_candidates')
+    assert mirror.has_synced('fec_candidates')
+    assert state['watermark'] == days_ago(0)
+    assert state['resume_page'] is None
+    assert mirror.status()['fec_records'] == 450
+
+
+def test_bill_sync_resumes_after_an_interrupted_run(mirror):
+    bills = [{'congress': 119, 'type': 'HR', 'number': i, 'title': f'Bill {i}',
+              'updateDate': days_ago(30 - i // 100, '%Y-%m-%dT%H:%M:%SZ')} for i in range(600)]
+    # Dies fetching the second page
+    client = FakeClient(bills=bills, fail_on_call=2)
+    with pytest.raises(ConnectionError):
+        asyncio.run(sync_congress_bills(mirror, client))
+    assert not mirror.has_synced('congress_bills')
+    assert mirror.status()['bills'] == 250
+    # The first page's progress was committed, so the next run starts from its newest update
+    assert mirror.watermark('congress_bills') == bills[249]['updateDate']
+
+    client = FakeClient(bills=bills)
+    asyncio.run(sync_congress_bills(mirror, client))
+    assert client.calls[0]['fromDateTime'] == bills[249]['updateDate']
+    assert mirror.status()['bills'] == 600
+    assert mirror.has_synced('congress_bills')
+
+
+def test_old_sync_state_table_is_migrated(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sync_state (resource TEXT PRIMARY KEY, watermark TEXT NOT NULL, "
+                 "synced_at REAL NOT NULL, records INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("INSERT INTO sync_state VALUES ('fec_candidates', '2025-01-01', 0, 10)")
+    conn.commit()
+    conn.close()
+    mirror = GovernmentMirror(path)
+    # Rows from before the complete flag existed must finish a pass before the bot relies on them
+    assert not mirror.has_synced('fec_candidates')
+    assert mirror.state('fec_candidates')['resume_page'] is None
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+from model_router import ModelRouter
+
+
+class FakeLLM:
+    """Stands in for a ChatOpenAI client, whose connection pool only works on the loop it was created on"""
+
+    def __init__(self, model, failing=()):
+        self.model = model
+        self.failing = failing
+        self.loop = asyncio.get_running_loop()
+
+    async def agenerate(self, batches):
+        assert asyncio.get_running_loop() is self.loop, "client used on a different event loop"
+        if self.model in self.failing:
+            raise ConnectionError(f"{self.model} unavailable")
+        return SimpleNamespace(
+            llm_output={'token_usage': {'prompt_tokens': 10, 'completion_tokens': 2}},
+            generations=[[SimpleNamespace(message=f"answer from {self.model}")]],
+        )
+
+
+def make_router(failing=()):
+    built = []
+
+    def factory(model):
+        llm = FakeLLM(model, failing)
+        built.append(llm)
+        return llm
+    return ModelRouter({'classify': ['primary', 'fallback']}, factory), built
+
+
+def test_clients_are_cached_per_event_loop():
+    router, built = make_router()
+
+    async def two_calls():
+        first = await router.ainvoke('classify', ['question'])
+        second = await router.ainvoke('classify', ['question'])
+        return first, second
+
+    # Each asyncio.run is a new loop: it gets its own client instead of reusing one bound to a closed loop
+    assert asyncio.run(two_calls()) == ("answer from primary", "answer from primary")
+    assert asyncio.run(two_calls()) == ("answer from primary", "answer from primary")
+    assert len(built) == 2
+    # The first loop is closed, so its clients were dropped when the second loop registered
+    assert len(router._llms) == 1
+
+
+def test_clients_outside_a_loop_are_not_cached():
+    router = ModelRouter({'classify': ['primary']}, lambda model: object())
+    # No running loop to tie them to, so each call gets a fresh client and nothing is kept
+    assert router.llm('primary') is not router.llm('primary')
+    assert router._llms == {}
+
+
+def test_failed_model_falls_back_on_the_same_loop():
+    router, built = make_router(failing={'primary'})
+    usage = []
+    assert asyncio.run(router.ainvoke('classify', ['question'], usage)) == "answer from fallback"
+    assert [entry['model'] for entry in usage] == ['fallback']
+    assert usage[0]['fallback'] is True
+    assert len({llm.loop for llm in built}) == 1
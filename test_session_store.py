@@ -0,0 +1,98 @@
+import json
+import os
+
+import pytest
+
+from session_store import SessionStore
+
+
+def turn(i, political=True):
+    return {'message': f"question {i}", 'response': "x" * 200, 'is_political': political, 'timestamp': str(i)}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'sessions'), str(tmp_path / 'stats.json')
+
+
+def test_least_recently_used_sessions_are_evicted_and_read_back(paths):
+    directory, stats_path = paths
+    # Room for roughly two sessions of three turns
+    store = SessionStore(directory, stats_path, memory_cap_bytes=2000)
+    ids = [store.create() for _ in range(3)]
+    for session_id in ids:
+        for i in range(3):
+            store.append_turn(session_id, turn(i))
+    assert store.resident_bytes <= store.memory_cap_bytes
+    assert ids[0] not in store._resident
+    assert store.counters['evictions'] >= 1
+
+    faults = store.counters['faults']
+    assert [t['message'] for t in store.get_history(ids[0])] == ["question 0", "question 1", "question 2"]
+    assert store.counters['faults'] == faults + 1
+    store.close()
+
+
+def test_idle_sessions_are_dropped(paths):
+    directory, stats_path = paths
+    store = SessionStore(directory, stats_path, idle_seconds=0)
+    session_id = store.create()
+    store.append_turn(session_id, turn(0))
+    assert store.memory_metrics()['resident_sessions'] == 0
+    assert store.counters['idle_evictions'] == 1
+    assert len(store.get_history(session_id)) == 1
+    store.close()
+
+
+def test_reload_after_flush_reads_no_session_files(paths, monkeypatch):
+    directory, stats_path = paths
+    store = SessionStore(directory, stats_path)
+    session_id = store.create()
+    for i in range(4):
+        store.append_turn(session_id, turn(i, political=i % 2 == 0))
+    store.close()
+
+    reads = []
+    monkeypatch.setattr(SessionStore, '_read_turns', lambda self, sid: reads.append(sid) or [])
+    reloaded = SessionStore(directory, stats_path)
+    assert reloaded.describe(session_id)['length'] == 4
+    assert reloaded.global_summary()['political_queries'] == 2
+    assert reads == []
+    reloaded.close()
+
+
+def test_turns_after_the_last_flush_are_recounted(paths):
+    directory, stats_path = paths
+    store = SessionStore(directory, stats_path)
+    kept, deleted = store.create(), store.create()
+    store.append_turn(kept, turn(0))
+    store.close()
+    # A hard kill: turns appended but never flushed, the last one torn mid-write
+    with open(os.path.join(directory, f"{kept}.jsonl"), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(turn(1)) + "\n")
+        f.write('{"message": "question 2", "resp')
+    os.remove(os.path.join(directory, f"{deleted}.jsonl"))
+
+    reloaded = SessionStore(directory, stats_path)
+    assert reloaded.describe(kept)['length'] == 2
+    assert reloaded.describe(deleted)['length'] == 0
+    assert reloaded.global_summary()['total_queries'] == 2
+    # The torn line was terminated, so the next turn is read back intact
+    reloaded.append_turn(kept, turn(3))
+    reloaded.close()
+    final = SessionStore(directory, stats_path)
+    assert [t['message'] for t in final.get_history(kept)] == ["question 0", "question 1", "question 3"]
+    final.close()
+
+
+def test_pagination_survives_deletes(paths):
+    directory, stats_path = paths
+    store = SessionStore(directory, stats_path)
+    ids = [store.create() for _ in range(5)]
+    store.delete(ids[3])
+    page, cursor = store.page(limit=2)
+    assert [item['session_id'] for item in page] == [ids[4], ids[2]]
+    page, cursor = store.page(cursor, limit=2)
+    assert [item['session_id'] for item in page] == [ids[1], ids[0]]
+    assert cursor is None
+    store.close()